@@ -8,7 +8,9 @@
 #
 # Run locally:
 #   python3 -m venv .venv && source .venv/bin/activate
-#   pip install -U fastapi uvicorn python-multipart pydantic openai PyMuPDF python-docx reportlab
+#   pip install -U fastapi uvicorn python-multipart pydantic openai PyMuPDF python-docx reportlab orjson
+#   # optional, trims contracts to an exact token budget:
+#   pip install tiktoken
 #   export OPENAI_API_KEY=sk-...
 #   # optional if you use an sk-proj key:
 #   export OPENAI_PROJECT=proj_...
@@ -16,28 +18,43 @@
 
 from __future__ import annotations
 
+import asyncio
+import codecs
 import io
-import json
 import os
-import re
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from functools import lru_cache
+from typing import BinaryIO, List, Optional
 
+import httpx
+import orjson
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+
+from middleware import PDFExemptGZipMiddleware
+from services.openai_core import extract_json_object, http2_available, load_encoding
 
 # ---------- OpenAI client ----------
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
 except Exception as e:
     raise RuntimeError("OpenAI SDK not installed. Run: pip install openai")
 
 _API_KEY = os.getenv("OPENAI_API_KEY")
 _PROJECT = os.getenv("OPENAI_PROJECT")  # optional for sk-proj keys
-client = OpenAI(api_key=_API_KEY, project=_PROJECT) if _PROJECT else OpenAI(api_key=_API_KEY)
+
+_HTTP2 = http2_available()
+
+# Shared pooled transport so concurrent analyses reuse warm connections
+_http_client = httpx.AsyncClient(
+    http2=_HTTP2,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+client = AsyncOpenAI(api_key=_API_KEY, project=_PROJECT, http_client=_http_client)
 
 # ---------- Google Cloud Storage ----------
 try:
@@ -47,7 +64,7 @@ except Exception as e:
     gcs_service = None
 
 # ---------- FastAPI ----------
-app = FastAPI(title="Lindle MVP API", version="0.4")
+app = FastAPI(title="Lindle MVP API", version="0.4", default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -55,6 +72,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PDFExemptGZipMiddleware, pdf_paths={"/analyze_pdf"}, minimum_size=500, compresslevel=5)
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await _http_client.aclose()
+
 
 # ---------- Models ----------
 class AnalysisResponse(BaseModel):
@@ -102,27 +126,38 @@ DATA_DIR = "data"
 ENTITIES_FILE = os.path.join(DATA_DIR, "entities.json")
 CONTRACTS_FILE = os.path.join(DATA_DIR, "contracts.json")
 
+# Validate each store in one pass straight from the raw JSON bytes
+_ENTITIES_ADAPTER = TypeAdapter(List[Entity])
+_CONTRACTS_ADAPTER = TypeAdapter(List[ContractOutcome])
+
 def ensure_data_dir():
     """Ensure data directory exists"""
     os.makedirs(DATA_DIR, exist_ok=True)
 
+def _write_json_file(path: str, data: bytes):
+    """Write data to path atomically so a crash never leaves a half-written store."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def load_entities() -> List[Entity]:
     """Load entities from JSON file"""
     ensure_data_dir()
     if not os.path.exists(ENTITIES_FILE):
         return []
     try:
-        with open(ENTITIES_FILE, 'r') as f:
-            data = json.load(f)
-            return [Entity(**entity) for entity in data]
+        with open(ENTITIES_FILE, 'rb') as f:
+            return _ENTITIES_ADAPTER.validate_json(f.read())
     except Exception:
         return []
 
 def save_entities(entities: List[Entity]):
     """Save entities to JSON file"""
     ensure_data_dir()
-    with open(ENTITIES_FILE, 'w') as f:
-        json.dump([entity.dict() for entity in entities], f, indent=2)
+    _write_json_file(ENTITIES_FILE, orjson.dumps([entity.dict() for entity in entities], option=orjson.OPT_INDENT_2))
 
 def load_contracts() -> List[ContractOutcome]:
     """Load contracts from JSON file"""
@@ -130,17 +165,15 @@ def load_contracts() -> List[ContractOutcome]:
     if not os.path.exists(CONTRACTS_FILE):
         return []
     try:
-        with open(CONTRACTS_FILE, 'r') as f:
-            data = json.load(f)
-            return [ContractOutcome(**contract) for contract in data]
+        with open(CONTRACTS_FILE, 'rb') as f:
+            return _CONTRACTS_ADAPTER.validate_json(f.read())
     except Exception:
         return []
 
 def save_contracts(contracts: List[ContractOutcome]):
     """Save contracts to JSON file"""
     ensure_data_dir()
-    with open(CONTRACTS_FILE, 'w') as f:
-        json.dump([contract.dict() for contract in contracts], f, indent=2)
+    _write_json_file(CONTRACTS_FILE, orjson.dumps([contract.dict() for contract in contracts], option=orjson.OPT_INDENT_2))
 
 def find_or_create_entity(name: str, entity_type: str, industry: str = None) -> Entity:
     """Find existing entity or create a new one"""
@@ -217,37 +250,53 @@ def update_entity_reputation(entity_id: str):
     save_entities(entities)
 
 # ---------- File extraction ----------
-SUPPORTED_EXTS = {"pdf", "docx", "txt"}
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 
 def _extract_text_from_pdf(file_bytes: bytes) -> str:
     import fitz  # PyMuPDF
-    text_parts: List[str] = []
+    buffer = io.StringIO()
     with fitz.open(stream=file_bytes, filetype="pdf") as doc:
         for page in doc:
-            text_parts.append(page.get_text("text") or "")
-    return "\n".join(text_parts).strip()
+            buffer.write(page.get_text("text") or "")
+            buffer.write("\n")
+    return buffer.getvalue().strip()
 
 
-def _extract_text_from_docx(file_bytes: bytes) -> str:
+def _extract_text_from_docx(f: BinaryIO) -> str:
     import docx
-    f = io.BytesIO(file_bytes)
     document = docx.Document(f)
     return "\n".join(p.text for p in document.paragraphs).strip()
 
 
-def _sniff_and_extract(filename: str, content: bytes) -> str:
-    ext = (filename.split(".")[-1] or "").lower()
-    if ext not in SUPPORTED_EXTS:
-        raise HTTPException(status_code=400, detail=f"Unsupported file type: .{ext}. Use PDF, DOCX, or TXT.")
+def _extract_text_from_txt(f: BinaryIO) -> str:
+    # Incremental decoding keeps multi-byte characters intact across chunk boundaries
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    buffer = io.StringIO()
+    while chunk := f.read(UPLOAD_CHUNK_SIZE):
+        buffer.write(decoder.decode(chunk))
+    buffer.write(decoder.decode(b"", final=True))
+    return buffer.getvalue()
+
+
+# Extractors by lowercase extension; PyMuPDF needs the PDF as bytes
+_EXTRACTORS = {
+    ".pdf": lambda f: _extract_text_from_pdf(f.read()),
+    ".docx": _extract_text_from_docx,
+    ".txt": _extract_text_from_txt,
+}
+
+
+def _sniff_and_extract(filename: str, f: BinaryIO) -> str:
+    """Extract text from an uploaded file object; only PDFs are read fully into memory."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext or 'none'}. Use PDF, DOCX, or TXT.")
     try:
-        if ext == "pdf":
-            return _extract_text_from_pdf(content)
-        if ext == "docx":
-            return _extract_text_from_docx(content)
-        return content.decode("utf-8", errors="ignore")
+        return extractor(f)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read {ext.upper()} file: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to read {ext[1:].upper()} file: {e}")
 
 # ---------- OpenAI prompts ----------
 SYSTEM_PROMPT = (
@@ -271,15 +320,43 @@ USER_PROMPT_TEMPLATE = (
 
 MODEL = os.getenv("LINDLE_MODEL", "gpt-4o-mini")
 
+# Contract budget per request, in tokens when tiktoken is available and in characters otherwise
+MAX_CONTRACT_TOKENS = int(os.getenv("LINDLE_MAX_CONTRACT_TOKENS", "6000"))
+MAX_CONTRACT_CHARS = 20000
+
+_ENCODING = load_encoding(MODEL)
 
-def call_openai(contract_text: str, role: str, risk: str) -> AnalysisResponse:
+
+def _trim_contract(text: str) -> str:
+    if _ENCODING is None:
+        return text[:MAX_CONTRACT_CHARS]
+    # An ASCII token covers at least one character, so short ASCII texts never need encoding;
+    # non-ASCII characters can split into several tokens each
+    if text.isascii() and len(text) <= MAX_CONTRACT_TOKENS:
+        return text
+    tokens = _ENCODING.encode(text)
+    if len(tokens) <= MAX_CONTRACT_TOKENS:
+        return text
+    return _ENCODING.decode(tokens[:MAX_CONTRACT_TOKENS])
+
+# Constant text around the contract, split once so each prompt is a plain join
+_PROMPT_HEAD, _PROMPT_TAIL = USER_PROMPT_TEMPLATE.split("{contract}")
+_PROMPT_SUFFIX = _PROMPT_TAIL.format()
+
+
+@lru_cache(maxsize=64)
+def _prompt_prefix(role: str, risk: str) -> str:
+    return _PROMPT_HEAD.format(role=role, risk=risk)
+
+
+async def call_openai(contract_text: str, role: str, risk: str) -> AnalysisResponse:
     if not _API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set on server")
 
-    trimmed = contract_text[:20000]  # basic guardrail
-    user_prompt = USER_PROMPT_TEMPLATE.format(role=role, risk=risk, contract=trimmed)
+    trimmed = _trim_contract(contract_text)  # basic guardrail
+    user_prompt = "".join((_prompt_prefix(role, risk), trimmed, _PROMPT_SUFFIX))
 
-    completion = client.chat.completions.create(
+    completion = await client.chat.completions.create(
         model=MODEL,
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
@@ -290,8 +367,7 @@ def call_openai(contract_text: str, role: str, risk: str) -> AnalysisResponse:
 
     content = completion.choices[0].message.content or ""
     try:
-        m = re.search(r"\{[\s\S]*\}", content)
-        data = json.loads(m.group(0) if m else content)
+        data = orjson.loads(extract_json_object(content) or content)
         summary = (data.get("summary") or "").strip()
         red_flags = [str(x).strip() for x in (data.get("red_flags") or [])][:5]
         pushbacks = [str(x).strip() for x in (data.get("pushbacks") or [])][:5]
@@ -323,32 +399,55 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
 from reportlab.lib.units import cm
+from xml.sax.saxutils import escape
+
+_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = _STYLES['Title']
+_HEADING_STYLE = _STYLES['Heading2']
+_BODY_STYLE = _STYLES['BodyText']
 
+# Chunk size used when streaming a rendered PDF back to the client
+PDF_CHUNK_SIZE = 64 * 1024
 
-def build_pdf(summary: str, red_flags: List[str], pushbacks: List[str]) -> bytes:
+# PDFs up to this size are sent as one response body instead of being streamed
+PDF_STREAM_MIN_BYTES = 1024 * 1024
+
+
+def _bullet_items(items: List[str]) -> tuple:
+    # Escape once so '&' and '<' in model output don't break ReportLab's markup parser
+    body = _BODY_STYLE
+    return tuple(ListItem(Paragraph(escape(x), body)) for x in items)
+
+
+def build_pdf(summary: str, red_flags: List[str], pushbacks: List[str]) -> io.BytesIO:
+    """Render the report into a BytesIO positioned at its start."""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=2*cm, rightMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
     story = []
 
-    story.append(Paragraph("<b>Lindle Contract Analysis</b>", styles['Title']))
+    story.append(Paragraph("<b>Lindle Contract Analysis</b>", _TITLE_STYLE))
     story.append(Spacer(1, 12))
 
-    story.append(Paragraph("<b>Summary</b>", styles['Heading2']))
-    story.append(Paragraph(summary.replace('\n', '<br/>'), styles['BodyText']))
+    story.append(Paragraph("<b>Summary</b>", _HEADING_STYLE))
+    story.append(Paragraph(escape(summary).replace('\n', '<br/>'), _BODY_STYLE))
     story.append(Spacer(1, 10))
 
-    story.append(Paragraph("<b>Top 5 Red Flags</b>", styles['Heading2']))
-    story.append(ListFlowable([ListItem(Paragraph(x, styles['BodyText'])) for x in red_flags], bulletType='bullet'))
+    story.append(Paragraph("<b>Top 5 Red Flags</b>", _HEADING_STYLE))
+    story.append(ListFlowable(_bullet_items(red_flags), bulletType='bullet'))
     story.append(Spacer(1, 10))
 
-    story.append(Paragraph("<b>Suggested Pushbacks</b>", styles['Heading2']))
-    story.append(ListFlowable([ListItem(Paragraph(x, styles['BodyText'])) for x in pushbacks], bulletType='bullet'))
+    story.append(Paragraph("<b>Suggested Pushbacks</b>", _HEADING_STYLE))
+    story.append(ListFlowable(_bullet_items(pushbacks), bulletType='bullet'))
 
     doc.build(story)
-    pdf_data = buffer.getvalue()
-    buffer.close()
-    return pdf_data
+    buffer.seek(0)
+    return buffer
+
+
+def _iter_chunks(buffer: io.BytesIO):
+    with buffer:
+        while chunk := buffer.read(PDF_CHUNK_SIZE):
+            yield chunk
 
 # ---------- Routes ----------
 @app.get("/")
@@ -372,18 +471,18 @@ async def analyze(
     role: str = Form("freelancer"),
     risk_tolerance: str = Form("standard"),
 ):
-    content = await file.read()
-    text = _sniff_and_extract(file.filename, content)
+    text = await asyncio.to_thread(_sniff_and_extract, file.filename, file.file)
     if not text or len(text) < 50:
         raise HTTPException(status_code=400, detail="Contract appears empty or too short.")
     
-    result = call_openai(text, role=role, risk=risk_tolerance)
+    result = await call_openai(text, role=role, risk=risk_tolerance)
     
     # Upload file to Google Cloud Storage
     gcs_file_path = None
     if gcs_service:
+        await file.seek(0)
         gcs_file_path = gcs_service.upload_file(
-            file_content=content,
+            file_content=file,
             file_name=file.filename,
             content_type=file.content_type
         )
@@ -444,18 +543,18 @@ async def analyze_pdf(
     role: str = Form("freelancer"),
     risk_tolerance: str = Form("standard"),
 ):
-    content = await file.read()
-    text = _sniff_and_extract(file.filename, content)
+    text = await asyncio.to_thread(_sniff_and_extract, file.filename, file.file)
     if not text or len(text) < 50:
         raise HTTPException(status_code=400, detail="Contract appears empty or too short.")
 
-    result = call_openai(text, role=role, risk=risk_tolerance)
+    result = await call_openai(text, role=role, risk=risk_tolerance)
     
     # Upload file to Google Cloud Storage
     gcs_file_path = None
     if gcs_service:
+        await file.seek(0)
         gcs_file_path = gcs_service.upload_file(
-            file_content=content,
+            file_content=file,
             file_name=file.filename,
             content_type=file.content_type
         )
@@ -463,9 +562,13 @@ async def analyze_pdf(
     else:
         print("GCS service not available, skipping file upload")
     
-    pdf_bytes = build_pdf(result.summary, result.red_flags, result.pushbacks)
+    pdf_buffer = await asyncio.to_thread(build_pdf, result.summary, result.red_flags, result.pushbacks)
     headers = {"Content-Disposition": "attachment; filename=contract_analysis.pdf"}
-    return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+    if pdf_buffer.getbuffer().nbytes <= PDF_STREAM_MIN_BYTES:
+        # Response sets Content-Length from the body
+        with pdf_buffer:
+            return Response(content=pdf_buffer.getvalue(), media_type="application/pdf", headers=headers)
+    return StreamingResponse(_iter_chunks(pdf_buffer), media_type="application/pdf", headers=headers)
 
 
 # ---------- Reputation Tracking Endpoints ----------
@@ -20,16 +20,18 @@ Run locally:
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from middleware import PDFExemptGZipMiddleware
 from routes.health import router as health_router
 from routes.analysis import router as analysis_router
 from routes.vault import router as vault_router
 from routes.access_approval import router as access_approval_router
-
+from services.vault_service import warm_vault_index
 
 
 # ---------- FastAPI ----------
-app = FastAPI(title="Lindle MVP API", version="0.4")
+app = FastAPI(title="Lindle MVP API", version="0.4", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -40,6 +42,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses; LLM output is repetitive and shrinks several times over
+app.add_middleware(PDFExemptGZipMiddleware, pdf_paths={"/analyze_pdf"}, minimum_size=500, compresslevel=5)
+
+@app.on_event("startup")
+async def load_vault_index():
+    """Load vaults into memory before serving requests."""
+    await warm_vault_index()
+
+
 # Include routers
 app.include_router(health_router, tags=["Health"])
 app.include_router(analysis_router, tags=["Analysis"])
@@ -0,0 +1,17 @@
+"""ASGI middleware shared by the Lindle backends."""
+
+from starlette.middleware.gzip import GZipMiddleware
+
+
+class PDFExemptGZipMiddleware(GZipMiddleware):
+    """Gzip responses except on routes that return PDFs, which are already compressed."""
+
+    def __init__(self, app, pdf_paths, **kwargs):
+        super().__init__(app, **kwargs)
+        self.pdf_paths = frozenset(pdf_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.pdf_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -33,6 +33,14 @@ class ClauseCategory(BaseModel):
     updated_at: str
 
 
+class ContractorInfo(BaseModel):
+    """Model for a potential contractor listed in a vault."""
+    name: str
+    contact_info: Optional[str] = None
+    specialization: Optional[str] = None
+    notes: Optional[str] = None
+
+
 class SharingSettings(BaseModel):
     """Model for vault sharing settings."""
     is_public: bool = False
@@ -43,15 +51,24 @@ class VaultData(BaseModel):
     """Model for personal clause vault data."""
     user_id: str
     clause_categories: List[ClauseCategory] = []
+    stake: str = ""  # What's at stake for the user (project, budget, etc.)
+    availability: str = ""  # User's availability (e.g., "Available Mon-Fri")
+    potential_contractors: List[ContractorInfo] = []
     sharing_settings: SharingSettings = SharingSettings()
     created_at: str
     updated_at: str
 
 
 class VaultCreateRequest(BaseModel):
-    """Request model for creating/updating vault data."""
-    clause_categories: List[ClauseCategory] = []
-    sharing_settings: SharingSettings = SharingSettings()
+    """Request model for creating/updating vault data.
+
+    Fields left as None keep their current value on update.
+    """
+    clause_categories: Optional[List[ClauseCategory]] = None
+    stake: Optional[str] = None
+    availability: Optional[str] = None
+    potential_contractors: Optional[List[ContractorInfo]] = None
+    sharing_settings: Optional[SharingSettings] = None
 
 
 class ClauseCreateRequest(BaseModel):
@@ -1,6 +1,6 @@
 """API routes for Document Access Approval functionality."""
 
-from fastapi import APIRouter, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from typing import List, Optional
 import httpx
 
@@ -15,8 +15,12 @@ from services.mock_document_access_service import MockDocumentAccessService
 router = APIRouter(prefix="/access-approval")
 
 
-async def get_service():
-    """Get the appropriate service (real or mock) based on availability."""
+async def get_document_access_service():
+    """Get the appropriate service (real or mock) based on availability.
+
+    Injected into the routes with Depends so tests can swap it via
+    app.dependency_overrides.
+    """
     try:
         # Try to connect to the external API first
         async with httpx.AsyncClient(timeout=5.0) as client:
@@ -30,11 +34,11 @@ async def get_service():
 
 @router.get("/access-requests", response_model=AccessRequestListResponse)
 async def get_access_requests(
-    pending_only: bool = Query(False, description="Get only pending requests for approvers")
+    pending_only: bool = Query(False, description="Get only pending requests for approvers"),
+    service=Depends(get_document_access_service)
 ):
     """Get all access requests or only pending ones for approvers."""
     try:
-        service = await get_service()
         access_requests = await service.get_access_requests(pending_only=pending_only)
         
         # Enrich with related data
@@ -52,11 +56,11 @@ async def get_access_requests(
 @router.post("/access-requests", response_model=AccessRequestResponse)
 async def create_access_request(
     request_data: CreateAccessRequestRequest,
-    user_id: int = Query(..., description="ID of the user making the request")
+    user_id: int = Query(..., description="ID of the user making the request"),
+    service=Depends(get_document_access_service)
 ):
     """Create a new access request for a document."""
     try:
-        service = await get_service()
         access_request = await service.create_access_request(user_id, request_data)
         
         # Enrich with related data
@@ -75,11 +79,11 @@ async def create_access_request(
 async def make_access_decision(
     request_id: int = Path(..., description="ID of the access request"),
     decision_data: AccessRequestDecisionRequest = ...,
-    approver_id: int = Query(..., description="ID of the user making the decision")
+    approver_id: int = Query(..., description="ID of the user making the decision"),
+    service=Depends(get_document_access_service)
 ):
     """Make a decision (approve/reject) on an access request."""
     try:
-        service = await get_service()
         access_request = await service.make_decision(request_id, decision_data, approver_id)
         
         # Enrich with related data
@@ -95,10 +99,9 @@ async def make_access_decision(
 
 
 @router.get("/documents", response_model=DocumentListResponse)
-async def get_documents():
+async def get_documents(service=Depends(get_document_access_service)):
     """Get all available documents."""
     try:
-        service = await get_service()
         documents = await service.get_documents()
         
         return DocumentListResponse(
@@ -112,11 +115,11 @@ async def get_documents():
 
 @router.get("/documents/{document_id}")
 async def get_document_by_id(
-    document_id: int = Path(..., description="ID of the document")
+    document_id: int = Path(..., description="ID of the document"),
+    service=Depends(get_document_access_service)
 ):
     """Get a specific document by ID."""
     try:
-        service = await get_service()
         document = await service.get_document_by_id(document_id)
         
         if not document:
@@ -133,10 +136,9 @@ async def get_document_by_id(
 
 
 @router.get("/users", response_model=UserListResponse)
-async def get_users():
+async def get_users(service=Depends(get_document_access_service)):
     """Get all users."""
     try:
-        service = await get_service()
         users = await service.get_users()
         
         return UserListResponse(
@@ -150,11 +152,11 @@ async def get_users():
 
 @router.get("/users/{user_id}")
 async def get_user_by_id(
-    user_id: int = Path(..., description="ID of the user")
+    user_id: int = Path(..., description="ID of the user"),
+    service=Depends(get_document_access_service)
 ):
     """Get a specific user by ID."""
     try:
-        service = await get_service()
         user = await service.get_user_by_id(user_id)
         
         if not user:
@@ -1,5 +1,6 @@
 """Contract analysis routes."""
 
+import asyncio
 import io
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
@@ -10,7 +11,7 @@ import re
 from models.analysis import AnalysisResponse
 from services.file_processor import extract_text_from_file
 from services.openai_service import analyze_contract
-from services.pdf_service import generate_analysis_pdf
+from services.pdf_service import iter_analysis_pdf
 from services.firebase_service import db
 from services.gcs_service import gcs_service
 
@@ -107,11 +108,11 @@ async def analyze_contract_endpoint(
     """Analyze contract and return results."""
     # Read file content once for text extraction
     content = await file.read()
-    text = extract_text_from_file(file.filename, content)
+    text = await asyncio.to_thread(extract_text_from_file, file.filename, content)
     if not text or len(text) < 50:
         raise HTTPException(status_code=400, detail="Contract appears empty or too short.")
 
-    result = analyze_contract(text, role=role, risk=risk_tolerance)
+    result = await asyncio.to_thread(analyze_contract, text, role=role, risk=risk_tolerance)
     
     # Upload file to Google Cloud Storage even for non-authenticated users
     gcs_file_path = None
@@ -156,14 +157,14 @@ async def analyze_pdf(
 ):
     """Analyze contract and return downloadable PDF report."""
     content = await file.read()
-    text = extract_text_from_file(file.filename, content)
+    text = await asyncio.to_thread(extract_text_from_file, file.filename, content)
     if not text or len(text) < 50:
         raise HTTPException(status_code=400, detail="Contract appears empty or too short.")
 
-    result = analyze_contract(text, role=role, risk=risk_tolerance)
-    pdf_bytes = generate_analysis_pdf(result.summary, result.red_flags, result.pushbacks)
+    result = await asyncio.to_thread(analyze_contract, text, role=role, risk=risk_tolerance)
+    pdf_chunks = iter_analysis_pdf(result.summary, result.red_flags, result.pushbacks)
     headers = {"Content-Disposition": "attachment; filename=contract_analysis.pdf"}
-    return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+    return StreamingResponse(pdf_chunks, media_type="application/pdf", headers=headers)
 
 
 @router.post("/analyze_with_user")
@@ -190,7 +191,7 @@ async def analyze_with_user(
         content = await file.read()
         print(f"File content read successfully, size: {len(content)} bytes")
         
-        text = extract_text_from_file(file.filename, content)
+        text = await asyncio.to_thread(extract_text_from_file, file.filename, content)
         print(f"Text extraction completed, length: {len(text)} characters")
         
         if not text or len(text) < 50:
@@ -198,7 +199,7 @@ async def analyze_with_user(
             raise HTTPException(status_code=400, detail="Contract appears empty or too short.")
 
         print("Starting contract analysis...")
-        result = analyze_contract(text, role=role, risk=risk_tolerance)
+        result = await asyncio.to_thread(analyze_contract, text, role=role, risk=risk_tolerance)
         print(f"Contract analysis completed successfully")
         print(f"Summary length: {len(result.summary)}")
         print(f"Red flags count: {len(result.red_flags)}")
@@ -227,6 +228,7 @@ async def analyze_with_user(
                     print("GCS service not available, skipping file upload")
                 
                 # Prepare contract data
+                now = datetime.utcnow().isoformat()
                 contract_data = {
                     'userId': user_id,
                     'fileName': file.filename,
@@ -238,8 +240,8 @@ async def analyze_with_user(
                     'role': role,
                     'riskTolerance': risk_tolerance,
                     'status': 'draft',
-                    'createdAt': datetime.utcnow().isoformat(),
-                    'updatedAt': datetime.utcnow().isoformat(),
+                    'createdAt': now,
+                    'updatedAt': now,
                     'extractedText': text,  # Add extracted text
                     'extractedClauses': extract_clauses_from_text(text)  # Add extracted clauses
                 }
@@ -45,7 +45,10 @@ async def create_or_update_user_vault(user_id: str, request: VaultCreateRequest)
         vault = create_or_update_vault(
             user_id=user_id,
             clause_categories=request.clause_categories,
-            sharing_settings=request.sharing_settings
+            sharing_settings=request.sharing_settings,
+            stake=request.stake,
+            availability=request.availability,
+            potential_contractors=request.potential_contractors
         )
         return VaultResponse(vault=vault, message="Vault updated successfully")
     except Exception as e:
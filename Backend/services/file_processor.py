@@ -8,9 +8,6 @@ from typing import List
 from fastapi import HTTPException
 
 
-SUPPORTED_EXTS = {"pdf", "docx", "txt"}
-
-
 @contextlib.contextmanager
 def change_working_directory(new_dir):
     """Context manager to safely change and restore working directory."""
@@ -122,14 +119,17 @@ def _extract_text_from_pdf(file_bytes: bytes) -> str:
             with change_working_directory(safe_dir):
                 print(f"Changed to working directory: {os.getcwd()}")
                 
+                # Write each page straight into one buffer instead of collecting a list to join
+                buffer = io.StringIO()
                 with fitz.open(stream=file_bytes, filetype="pdf") as doc:
                     print(f"PDF opened successfully, pages: {len(doc)}")
                     for page_num, page in enumerate(doc):
                         text = page.get_text("text") or ""
-                        text_parts.append(text)
+                        buffer.write(text)
+                        buffer.write("\n")
                         print(f"Page {page_num + 1}: {len(text)} characters extracted")
             
-            return "\n".join(text_parts).strip()
+            return buffer.getvalue().strip()
             
         except Exception as fitz_error:
             print(f"Stream processing failed: {fitz_error}")
@@ -240,27 +240,37 @@ def _extract_text_from_docx(file_bytes: bytes) -> str:
     return "\n".join(p.text for p in document.paragraphs).strip()
 
 
+def _decode_text(file_bytes: bytes) -> str:
+    """Decode TXT file bytes as UTF-8, skipping invalid bytes."""
+    return file_bytes.decode("utf-8", errors="ignore")
+
+
+# Extractors by lowercase file extension
+_EXTRACTORS = {
+    ".pdf": _extract_text_from_pdf,
+    ".docx": _extract_text_from_docx,
+    ".txt": _decode_text,
+}
+
+
 def extract_text_from_file(filename: str, content: bytes) -> str:
     """Extract text from uploaded file based on file extension."""
-    ext = (filename.split(".")[-1] or "").lower()
-    if ext not in SUPPORTED_EXTS:
+    ext = os.path.splitext(filename or "")[1].lower()
+    extractor = _EXTRACTORS.get(ext)
+    if extractor is None:
         raise HTTPException(
             status_code=400, 
-            detail=f"Unsupported file type: .{ext}. Use PDF, DOCX, or TXT."
+            detail=f"Unsupported file type: {ext or 'none'}. Use PDF, DOCX, or TXT."
         )
 
     print("Extracting text from file..")
     print(ext)
     
     try:
-        if ext == "pdf":
-            return _extract_text_from_pdf(content)
-        if ext == "docx":
-            return _extract_text_from_docx(content)
-        return content.decode("utf-8", errors="ignore")
+        return extractor(content)
     except Exception as e:
 
         raise HTTPException(
             status_code=400, 
-            detail=f"Failed to read {ext.upper()} file: {e}"
+            detail=f"Failed to read {ext[1:].upper()} file: {e}"
         )
\ No newline at end of file
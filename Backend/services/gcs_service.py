@@ -1,12 +1,32 @@
 """Google Cloud Storage service for file operations."""
 
 import os
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 from google.cloud import storage
 from google.cloud.exceptions import NotFound
 import uuid
 from fastapi import UploadFile
 
+
+_CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.txt': 'text/plain',
+    '.rtf': 'application/rtf',
+    '.odt': 'application/vnd.oasis.opendocument.text',
+    '.html': 'text/html',
+    '.htm': 'text/html',
+}
+
+
+def _prepare_upload(file_name: str, content_type: Optional[str]) -> Tuple[str, str, Optional[str]]:
+    """Derive the blob name, file extension and content type for an upload in one pass."""
+    file_extension = os.path.splitext(file_name)[1]
+    blob_name = f"{uuid.uuid4().hex}{file_extension}"
+    return blob_name, file_extension, content_type or _CONTENT_TYPES.get(file_extension.lower())
+
+
 class GCSService:
     def __init__(self):
         """Initialize Google Cloud Storage client."""
@@ -54,57 +74,52 @@ class GCSService:
                 if not content_type:
                     content_type = file_content.content_type
                 
-                # Read file content and convert to bytes
-                file_bytes = file_content.file.read()
-                # Reset file pointer for potential future reads
-                file_content.file.seek(0)
-                print(f"Read {len(file_bytes)} bytes from UploadFile")
-            else:
+            elif not file_name:
                 # Handle bytes input
-                file_bytes = file_content
-                if not file_name:
-                    file_name = "unknown_file"
+                file_name = "unknown_file"
             
-            # Generate unique ID for the file
-            file_id = str(uuid.uuid4())
-            
-            # Get file extension from original filename
-            file_extension = os.path.splitext(file_name)[1] if '.' in file_name else ''
-            
-            # Create GCS blob name with ID and extension
-            blob_name = f"{file_id}{file_extension}"
+            # Unique blob name with the original extension, and the provided
+            # content type or one inferred from that extension
+            blob_name, file_extension, blob_content_type = _prepare_upload(file_name, content_type)
             
             # Create blob and upload
             blob = self.bucket.blob(blob_name)
             
-            # Set content type if provided, otherwise try to infer from extension
-            if content_type:
-                blob.content_type = content_type
-                print(f"Using provided content type: {content_type}")
+            if blob_content_type:
+                blob.content_type = blob_content_type
+                print(f"Using content type: {blob_content_type}")
             else:
-                # Infer content type from file extension
-                inferred_type = self._infer_content_type(file_extension)
-                if inferred_type:
-                    blob.content_type = inferred_type
-                    print(f"Using inferred content type: {inferred_type}")
-                else:
-                    print(f"Could not infer content type for extension: {file_extension}")
+                print(f"Could not infer content type for extension: {file_extension}")
             
             print(f"Final blob content type before upload: {blob.content_type}")
             print(f"File extension: {file_extension}")
             print(f"Original filename: {file_name}")
             
             # Upload file content with explicit content type to avoid mismatch
-            blob.upload_from_string(
-                file_bytes, 
-                content_type=blob.content_type
-            )
+            if isinstance(file_content, UploadFile):
+                # Stream the spooled upload rather than reading it into memory;
+                # files over the multipart limit go up in resumable chunks
+                file_size = file_content.file.seek(0, os.SEEK_END)
+                file_content.file.seek(0)
+                blob.upload_from_file(
+                    file_content.file,
+                    size=file_size,
+                    content_type=blob.content_type
+                )
+                # Reset file pointer for potential future reads
+                file_content.file.seek(0)
+            else:
+                file_size = len(file_content)
+                blob.upload_from_string(
+                    file_content, 
+                    content_type=blob.content_type
+                )
             
             # Note: make_public() is not needed when uniform bucket-level access is enabled
             # The bucket should be configured to allow public read access at the bucket level
             print(f"File uploaded successfully to GCS: {blob_name}")
             print(f"Content-Type: {blob.content_type}")
-            print(f"File size: {len(file_bytes)} bytes")
+            print(f"File size: {file_size} bytes")
             return blob_name
             
         except Exception as e:
@@ -115,20 +130,6 @@ class GCSService:
                 print(f"UploadFile content_type: {file_content.content_type}")
             return None
 
-    def _infer_content_type(self, file_extension: str) -> Optional[str]:
-        """Infer content type from file extension."""
-        content_types = {
-            '.pdf': 'application/pdf',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            '.doc': 'application/msword',
-            '.txt': 'text/plain',
-            '.rtf': 'application/rtf',
-            '.odt': 'application/vnd.oasis.opendocument.text',
-            '.html': 'text/html',
-            '.htm': 'text/html',
-        }
-        return content_types.get(file_extension.lower())
-
     def get_file_url(self, blob_name: str) -> Optional[str]:
         """
         Get the public URL for a file in GCS.
@@ -1,6 +1,6 @@
 """Mock service for testing Document Access Approval API when external API is not available."""
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from datetime import datetime
 
 from models.access_approval import (
@@ -50,12 +50,29 @@ class MockDocumentAccessService:
         ]
         
         self.next_request_id = 4
+        
+        # Lookup indices keyed by ID, kept in sync with the lists above
+        self._users_by_id = {user.id: user for user in self.users}
+        self._docs_by_id = {doc.id: doc for doc in self.documents}
+        self._reqs_by_id = {req.id: req for req in self.access_requests}
+        
+        # Read-only snapshots handed to callers; rebuilt only on mutation
+        self._users_view = tuple(self.users)
+        self._documents_view = tuple(self.documents)
+        self._refresh_request_views()
     
-    async def get_access_requests(self, pending_only: bool = False) -> List[AccessRequest]:
+    def _refresh_request_views(self):
+        """Rebuild the access request snapshots after a mutation."""
+        self._requests_view = tuple(self.access_requests)
+        self._pending_view = tuple(
+            req for req in self.access_requests if req.status == AccessRequestStatus.PENDING
+        )
+    
+    async def get_access_requests(self, pending_only: bool = False) -> Sequence[AccessRequest]:
         """Get all access requests or only pending ones."""
         if pending_only:
-            return [req for req in self.access_requests if req.status == AccessRequestStatus.PENDING]
-        return self.access_requests.copy()
+            return self._pending_view
+        return self._requests_view
     
     async def create_access_request(self, user_id: int, request_data: CreateAccessRequestRequest) -> AccessRequest:
         """Create a new access request."""
@@ -68,54 +85,48 @@ class MockDocumentAccessService:
             requested_at=datetime.now()
         )
         self.access_requests.append(new_request)
+        self._reqs_by_id[new_request.id] = new_request
+        self._refresh_request_views()
         self.next_request_id += 1
         return new_request
     
     async def make_decision(self, request_id: int, decision_data: AccessRequestDecisionRequest, approver_id: int) -> AccessRequest:
         """Make a decision (approve/reject) on an access request."""
-        for request in self.access_requests:
-            if request.id == request_id:
-                request.status = decision_data.decision
-                request.decided_at = datetime.now()
-                request.decided_by = approver_id
-                request.decision_reason = decision_data.reason
-                return request
+        request = self._reqs_by_id.get(request_id)
+        if request is None:
+            raise ValueError(f"Access request {request_id} not found")
         
-        raise ValueError(f"Access request {request_id} not found")
+        request.status = decision_data.decision
+        request.decided_at = datetime.now()
+        request.decided_by = approver_id
+        request.decision_reason = decision_data.reason
+        self._refresh_request_views()
+        return request
     
-    async def get_documents(self) -> List[Document]:
+    async def get_documents(self) -> Sequence[Document]:
         """Get all documents."""
-        return self.documents.copy()
+        return self._documents_view
     
     async def get_document_by_id(self, document_id: int) -> Optional[Document]:
         """Get a document by ID."""
-        for doc in self.documents:
-            if doc.id == document_id:
-                return doc
-        return None
+        return self._docs_by_id.get(document_id)
     
-    async def get_users(self) -> List[User]:
+    async def get_users(self) -> Sequence[User]:
         """Get all users."""
-        return self.users.copy()
+        return self._users_view
     
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get a user by ID."""
-        for user in self.users:
-            if user.id == user_id:
-                return user
-        return None
+        return self._users_by_id.get(user_id)
     
-    async def enrich_access_requests(self, access_requests: List[AccessRequest]) -> List[AccessRequest]:
+    async def enrich_access_requests(self, access_requests: Sequence[AccessRequest]) -> List[AccessRequest]:
         """Enrich access requests with user and document information."""
-        users_dict = {user.id: user for user in self.users}
-        documents_dict = {doc.id: doc for doc in self.documents}
-        
         enriched_requests = []
         for request in access_requests:
-            request.user = users_dict.get(request.user_id)
-            request.document = documents_dict.get(request.document_id)
+            request.user = self._users_by_id.get(request.user_id)
+            request.document = self._docs_by_id.get(request.document_id)
             if request.decided_by:
-                request.approver = users_dict.get(request.decided_by)
+                request.approver = self._users_by_id.get(request.decided_by)
             enriched_requests.append(request)
         
         return enriched_requests
\ No newline at end of file
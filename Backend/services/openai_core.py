@@ -0,0 +1,410 @@
+"""Client-agnostic core of the OpenAI contract analysis.
+
+Holds the prompts, the response parsing and the completion call so that
+callers only need to supply a configured OpenAI-compatible client.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import orjson
+from fastapi import HTTPException
+from models.analysis import AnalysisResponse
+
+logger = logging.getLogger(__name__)
+
+# Prompts
+SYSTEM_PROMPT = (
+    "You are Lindle, a concise contract assistant for people who RECEIVE contracts they didn't write. "
+    "Use plain, non-legalese language. You do not provide legal advice; you provide educational guidance."
+)
+
+USER_PROMPT_TEMPLATE = (
+    "ROLE: {role}\nRISK_TOLERANCE: {risk}\n\n"
+    "TASKS:\n"
+    "1) SUMMARY (<= 180 words): Briefly explain parties, scope, payment, term, obligations.\n"
+    "2) RED_FLAGS (5 bullets): Most material risks for the ROLE; name clauses or short quotes if helpful.\n"
+    "3) PUSHBACKS (5 bullets): Polite, firm negotiation asks aligned to RISK_TOLERANCE.\n\n"
+    "CONTRACT TEXT:\n{contract}\n\n"
+    "RETURN STRICT JSON with keys: summary (string), red_flags (string[ ]), pushbacks (string[ ])."
+)
+
+BATCH_PROMPT_TEMPLATE = (
+    "Analyze each contract below independently, using its own ROLE and RISK_TOLERANCE.\n\n"
+    "TASKS (per contract):\n"
+    "1) SUMMARY (<= 180 words): Briefly explain parties, scope, payment, term, obligations.\n"
+    "2) RED_FLAGS (5 bullets): Most material risks for the ROLE; name clauses or short quotes if helpful.\n"
+    "3) PUSHBACKS (5 bullets): Polite, firm negotiation asks aligned to RISK_TOLERANCE.\n\n"
+    "CONTRACTS (JSON):\n{contracts}\n\n"
+    "RETURN STRICT JSON with key results: an array with one object per contract, each with keys "
+    "id (integer, copied from the input), summary (string), red_flags (string[ ]), pushbacks (string[ ])."
+)
+
+CHUNK_PROMPT_TEMPLATE = (
+    "ROLE: {role}\nRISK_TOLERANCE: {risk}\n\n"
+    "This is part {index} of {total} of a longer contract. Review only this part.\n"
+    "TASKS:\n"
+    "1) NOTES (<= 80 words): Parties, scope, payment, term or obligations found in this part.\n"
+    "2) RED_FLAGS (up to 5 bullets): Material risks for the ROLE in this part.\n"
+    "3) PUSHBACKS (up to 5 bullets): Negotiation asks aligned to RISK_TOLERANCE for this part.\n\n"
+    "CONTRACT PART:\n{contract}\n\n"
+    "RETURN STRICT JSON with keys: notes (string), red_flags (string[ ]), pushbacks (string[ ])."
+)
+
+REDUCE_PROMPT_TEMPLATE = (
+    "ROLE: {role}\nRISK_TOLERANCE: {risk}\n\n"
+    "Below are findings from the {total} parts of one contract, in order.\n"
+    "TASKS:\n"
+    "1) SUMMARY (<= 180 words): Briefly explain parties, scope, payment, term, obligations.\n"
+    "2) RED_FLAGS (5 bullets): The most material risks for the ROLE across all parts; merge duplicates.\n"
+    "3) PUSHBACKS (5 bullets): Polite, firm negotiation asks aligned to RISK_TOLERANCE.\n\n"
+    "FINDINGS (JSON):\n{findings}\n\n"
+    "RETURN STRICT JSON with keys: summary (string), red_flags (string[ ]), pushbacks (string[ ])."
+)
+
+# Contracts longer than this are analyzed in chunks instead of in one prompt
+MAX_CONTRACT_CHARS = 20000
+
+# Chunk size and parallelism for the map step of long-contract analysis
+CHUNK_CHARS = 6000
+MAX_CHUNK_WORKERS = 8
+
+# Section boundaries: numbered clauses ("12. ") and upper-case heading lines
+_SECTION_BREAK_RE = re.compile(r"\n(?=\d+\.\s|[A-Z][A-Z ]{4,}\n)")
+
+# Limits for packing several contracts into one batched request
+MAX_BATCH_ITEMS = 8
+MAX_BATCH_CHARS = 60000
+
+# Constant text around the contract in USER_PROMPT_TEMPLATE, split once so the
+# contract is only concatenated in rather than run through str.format
+_PROMPT_HEAD, _PROMPT_TAIL = USER_PROMPT_TEMPLATE.split("{contract}")
+_PROMPT_SUFFIX = _PROMPT_TAIL.format()
+
+# (contract_text, role, risk)
+AnalysisItem = Tuple[str, str, str]
+CompletionCallback = Callable[[str, str, Optional[int]], None]
+# Called with the user prompt right before each completion request
+RequestHook = Callable[[str], None]
+
+
+def http2_available() -> bool:
+    """Return whether httpx can negotiate HTTP/2, which needs the optional h2 package."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning('h2 not installed, OpenAI requests will use HTTP/1.1 (pip install "httpx[http2]")')
+        return False
+    return True
+
+
+def load_encoding(model: str):
+    """Return the tiktoken encoding for ``model``, or None when tiktoken can't load it.
+
+    Models tiktoken doesn't know yet fall back to ``o200k_base``.
+    """
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("tiktoken not available, falling back to character counts: %s", e)
+        return None
+
+
+def extract_json_object(content: str) -> Optional[str]:
+    """Return the first balanced ``{...}`` object in ``content``, if any.
+
+    A single linear pass that tracks string literals and escapes, so braces
+    inside JSON strings don't affect the nesting depth.
+    """
+    start = content.find("{")
+    if start < 0:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(content)):
+        ch = content[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return content[start:i + 1]
+    return None
+
+
+def _analysis_from_dict(data: dict, tokens_used=None) -> AnalysisResponse:
+    """Build an AnalysisResponse from one decoded result object."""
+    return AnalysisResponse(
+        summary=(data.get("summary") or "").strip(),
+        red_flags=[str(x).strip() for x in (data.get("red_flags") or [])][:5],
+        pushbacks=[str(x).strip() for x in (data.get("pushbacks") or [])][:5],
+        tokens_used=tokens_used
+    )
+
+
+def parse_analysis(content: str, tokens_used=None) -> AnalysisResponse:
+    """Parse the model's JSON reply into an AnalysisResponse, falling back to raw text."""
+    try:
+        data = orjson.loads(extract_json_object(content) or content)
+        return _analysis_from_dict(data, tokens_used)
+    except Exception:
+        return AnalysisResponse(
+            summary=content[:1000],
+            red_flags=[],
+            pushbacks=[],
+            tokens_used=tokens_used
+        )
+
+
+def parse_batch_analysis(content: str) -> Dict[int, AnalysisResponse]:
+    """Parse a batched reply into AnalysisResponses keyed by contract id.
+
+    Results that are missing or malformed are simply left out.
+    """
+    try:
+        data = orjson.loads(extract_json_object(content) or content)
+        results = data.get("results") or []
+    except Exception:
+        return {}
+
+    parsed = {}
+    for entry in results:
+        try:
+            parsed[int(entry["id"])] = _analysis_from_dict(entry)
+        except Exception:
+            continue
+    return parsed
+
+
+def split_batches(items: Sequence[AnalysisItem]) -> List[List[int]]:
+    """Group item indexes into batches that respect the item and character caps.
+
+    Contracts longer than ``MAX_CONTRACT_CHARS`` always get a batch of their
+    own, so they go through the chunked single-contract analysis.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_chars = 0
+    for i, (contract_text, _, _) in enumerate(items):
+        size = len(contract_text)
+        if size > MAX_CONTRACT_CHARS:
+            batches.append([i])
+            continue
+        if current and (len(current) >= MAX_BATCH_ITEMS or current_chars + size > MAX_BATCH_CHARS):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(i)
+        current_chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+@lru_cache(maxsize=64)
+def _prompt_prefix(role: str, risk: str) -> str:
+    """Return the part of the user prompt before the contract for a role/risk pair."""
+    return _PROMPT_HEAD.format(role=role, risk=risk)
+
+
+def build_user_prompt(contract_text: str, role: str, risk: str) -> str:
+    """Build the single-prompt analysis request for a contract."""
+    return _prompt_prefix(role, risk) + contract_text + _PROMPT_SUFFIX
+
+
+def _complete(
+    client,
+    model: str,
+    user_prompt: str,
+    on_completion: Optional[CompletionCallback] = None,
+    before_request: Optional[RequestHook] = None
+) -> Tuple[str, Optional[int]]:
+    """Send one system+user turn and return the reply text and token usage."""
+    if before_request:
+        before_request(user_prompt)
+    completion = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ],
+        temperature=0.2,
+    )
+
+    content = completion.choices[0].message.content or ""
+
+    tokens_used = None
+    try:
+        tokens_used = getattr(completion, "usage", None).total_tokens
+    except Exception:
+        pass
+
+    if on_completion:
+        on_completion(user_prompt, content, tokens_used)
+
+    return content, tokens_used
+
+
+def split_contract(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """Split contract text into chunks of at most ``max_chars``.
+
+    Chunks break at numbered sections and upper-case headings where possible;
+    a single section longer than ``max_chars`` is cut into fixed-size pieces.
+    """
+    chunks: List[str] = []
+    current = ""
+    for section in _SECTION_BREAK_RE.split(text):
+        while len(section) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(section[:max_chars])
+            section = section[max_chars:]
+        if current and len(current) + 1 + len(section) > max_chars:
+            chunks.append(current)
+            current = section
+        else:
+            current = f"{current}\n{section}" if current else section
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def _run_chunked_analysis(
+    client,
+    model: str,
+    contract_text: str,
+    role: str,
+    risk: str,
+    on_completion: Optional[CompletionCallback] = None,
+    before_request: Optional[RequestHook] = None
+) -> AnalysisResponse:
+    """Map each chunk to partial findings in parallel, then reduce them into one analysis."""
+    chunks = split_contract(contract_text)
+    total = len(chunks)
+
+    def analyze_chunk(indexed_chunk):
+        index, chunk = indexed_chunk
+        prompt = CHUNK_PROMPT_TEMPLATE.format(role=role, risk=risk, index=index + 1, total=total, contract=chunk)
+        content, tokens = _complete(client, model, prompt, on_completion, before_request)
+        try:
+            findings = orjson.loads(extract_json_object(content) or content)
+        except Exception:
+            findings = {"notes": content[:1000]}
+        if not isinstance(findings, dict):
+            findings = {"notes": findings}
+        findings["part"] = index + 1
+        return findings, tokens
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CHUNK_WORKERS, total)) as executor:
+        mapped = list(executor.map(analyze_chunk, enumerate(chunks)))
+
+    findings = [f for f, _ in mapped]
+    reduce_prompt = REDUCE_PROMPT_TEMPLATE.format(
+        role=role, risk=risk, total=total, findings=orjson.dumps(findings).decode()
+    )
+    content, tokens = _complete(client, model, reduce_prompt, on_completion, before_request)
+
+    token_counts = [t for _, t in mapped] + [tokens]
+    tokens_used = sum(token_counts) if all(t is not None for t in token_counts) else None
+    return parse_analysis(content, tokens_used)
+
+
+def run_analysis(
+    client,
+    model: str,
+    contract_text: str,
+    role: str,
+    risk: str,
+    on_completion: Optional[CompletionCallback] = None,
+    before_request: Optional[RequestHook] = None
+) -> AnalysisResponse:
+    """Run a contract analysis with the given OpenAI client.
+
+    Contracts longer than ``MAX_CONTRACT_CHARS`` are chunked and analyzed
+    map-reduce style instead of being truncated.
+
+    If given, ``before_request`` is called with the user prompt before the
+    completion is requested (e.g. for rate limiting), and ``on_completion``
+    with the user prompt, the raw model reply and the token usage once the
+    completion has returned.
+    """
+    try:
+        if len(contract_text) > MAX_CONTRACT_CHARS:
+            return _run_chunked_analysis(
+                client, model, contract_text, role, risk, on_completion, before_request
+            )
+
+        user_prompt = build_user_prompt(contract_text, role, risk)
+        content, tokens_used = _complete(client, model, user_prompt, on_completion, before_request)
+        return parse_analysis(content, tokens_used)
+    except Exception as e:
+        print(f"Error in OpenAI analysis: {e}")
+        raise HTTPException(status_code=500, detail=f"OpenAI analysis failed: {str(e)}")
+
+
+def run_batch_analysis(
+    client,
+    model: str,
+    items: Sequence[AnalysisItem],
+    on_completion: Optional[CompletionCallback] = None,
+    before_request: Optional[RequestHook] = None
+) -> List[AnalysisResponse]:
+    """Analyze several contracts with as few completion requests as possible.
+
+    Items are packed into batches (see ``split_batches``), each sent as a single
+    request and matched back to its input by id. Contracts too long to batch
+    are analyzed on their own with ``run_analysis``. A contract whose result is
+    missing from the batched reply is re-analyzed on its own. Results are
+    returned in input order.
+    """
+    results: List[Optional[AnalysisResponse]] = [None] * len(items)
+
+    for batch in split_batches(items):
+        if len(batch) == 1:
+            i = batch[0]
+            results[i] = run_analysis(
+                client, model, *items[i], on_completion=on_completion, before_request=before_request
+            )
+            continue
+
+        contracts = [
+            {
+                "id": i,
+                "role": items[i][1],
+                "risk_tolerance": items[i][2],
+                "contract": items[i][0],
+            }
+            for i in batch
+        ]
+        user_prompt = BATCH_PROMPT_TEMPLATE.format(contracts=orjson.dumps(contracts).decode())
+
+        try:
+            content, _ = _complete(client, model, user_prompt, on_completion, before_request)
+        except Exception as e:
+            print(f"Error in OpenAI batch analysis: {e}")
+            raise HTTPException(status_code=500, detail=f"OpenAI analysis failed: {str(e)}")
+
+        parsed = parse_batch_analysis(content)
+        for i in batch:
+            results[i] = parsed.get(i) or run_analysis(
+                client, model, *items[i], on_completion=on_completion, before_request=before_request
+            )
+
+    return results
@@ -1,11 +1,25 @@
 """OpenAI service for contract analysis."""
 
-import json
 import os
-import re
+import queue
+import random
+import threading
+from functools import lru_cache
+from typing import List, Sequence
+import httpx
 from fastapi import HTTPException
 from models.analysis import AnalysisResponse
 from dotenv import load_dotenv
+from services.openai_core import (
+    SYSTEM_PROMPT,
+    USER_PROMPT_TEMPLATE,
+    AnalysisItem,
+    http2_available,
+    load_encoding,
+    run_analysis,
+    run_batch_analysis,
+)
+from services.rate_limiter import TokenBucket
 
 
 # Langfuse configuration - handle import errors gracefully
@@ -22,16 +36,7 @@ except Exception as e:
     print(f"Warning: Langfuse not available: {e}")
     langfuse = None
 
-# Import Langfuse wrapped OpenAI client - handle import errors gracefully
-langfuse_openai = None
-try:
-    from langfuse.openai import openai as langfuse_openai
-    print("Langfuse OpenAI client imported successfully")
-except Exception as e:
-    print(f"Warning: Langfuse OpenAI client not available: {e}")
-    langfuse_openai = None
-
-# Fallback to regular OpenAI client
+# Regular OpenAI client; tracing is exported separately by the Langfuse worker below
 try:
     from openai import OpenAI
     print("Regular OpenAI client imported successfully")
@@ -46,87 +51,160 @@ load_dotenv() # Load environment variables from .env file if present
 _API_KEY = os.getenv("OPENAI_API_KEY")
 _PROJECT = os.getenv("OPENAI_PROJECT")
 
+_HTTP2 = http2_available()
+
+# Shared transport for the OpenAI SDK: with HTTP/2 concurrent analyses are
+# multiplexed over one TCP+TLS session instead of opening a connection each
+_HTTP_CLIENT = httpx.Client(
+    http2=_HTTP2,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
+@lru_cache(maxsize=1)
 def _get_openai_client():
-    """Get OpenAI client instance."""
+    """Get the OpenAI client instance, built once and reused across requests."""
     if not _API_KEY:
         return None
     
-    # Try Langfuse OpenAI first, fallback to regular OpenAI
-    if langfuse_openai:
-        try:
-            return langfuse_openai.OpenAI(api_key=_API_KEY, project=_PROJECT) if _PROJECT else langfuse_openai.OpenAI(api_key=_API_KEY)
-        except Exception as e:
-            print(f"Langfuse OpenAI client failed, falling back to regular client: {e}")
+    client_kwargs = {"api_key": _API_KEY, "http_client": _HTTP_CLIENT}
+    if _PROJECT:
+        client_kwargs["project"] = _PROJECT
     
     if OpenAI:
-        return OpenAI(api_key=_API_KEY, project=_PROJECT) if _PROJECT else OpenAI(api_key=_API_KEY)
+        return OpenAI(**client_kwargs)
     
     return None
 
 # Model configuration
 MODEL = os.getenv("LINDLE_MODEL", "gpt-4o-mini")
 
-# Prompts
-SYSTEM_PROMPT = (
-    "You are Lindle, a concise contract assistant for people who RECEIVE contracts they didn't write. "
-    "Use plain, non-legalese language. You do not provide legal advice; you provide educational guidance."
-)
+# Token counting for rate limiting - fall back to a character estimate without tiktoken
+_ENCODING = load_encoding(MODEL)
 
-USER_PROMPT_TEMPLATE = (
-    "ROLE: {role}\nRISK_TOLERANCE: {risk}\n\n"
-    "TASKS:\n"
-    "1) SUMMARY (<= 180 words): Briefly explain parties, scope, payment, term, obligations.\n"
-    "2) RED_FLAGS (5 bullets): Most material risks for the ROLE; name clauses or short quotes if helpful.\n"
-    "3) PUSHBACKS (5 bullets): Polite, firm negotiation asks aligned to RISK_TOLERANCE.\n\n"
-    "CONTRACT TEXT:\n{contract}\n\n"
-    "RETURN STRICT JSON with keys: summary (string), red_flags (string[ ]), pushbacks (string[ ])."
-)
+# Client-side request/token budgets, paced so bursts don't run into 429 retries
+_RPM_LIMIT = int(os.getenv("LINDLE_RPM", "500"))
+_TPM_LIMIT = int(os.getenv("LINDLE_TPM", "200000"))
+_RPM_BUCKET = TokenBucket(rate=_RPM_LIMIT / 60, capacity=_RPM_LIMIT)
+_TPM_BUCKET = TokenBucket(rate=_TPM_LIMIT / 60, capacity=_TPM_LIMIT)
 
 
-def analyze_contract(contract_text: str, role: str, risk: str) -> AnalysisResponse:
-    """Analyze contract text using OpenAI and return structured response."""
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens ``text`` uses for the configured model."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+
+def _throttle(user_prompt: str):
+    """Wait until both the request and the token budget allow another call."""
+    _RPM_BUCKET.acquire(1)
+    _TPM_BUCKET.acquire(estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user_prompt))
+
+
+# Share of analyses traced to Langfuse (head-based sampling, decided per call)
+_TRACE_SAMPLE_RATE = float(os.getenv("LINDLE_TRACE_SAMPLE_RATE", "1.0"))
+# Failed analyses are always traced unless this is turned off
+_TRACE_ERRORS = os.getenv("LINDLE_TRACE_ERRORS", "true").lower() != "false"
+
+# Trace payloads waiting to be exported to Langfuse by the background worker
+_TRACE_Q: "queue.Queue[dict]" = queue.Queue()
+
+
+def _drain_traces():
+    """Export queued traces to Langfuse, flushing whenever the queue runs dry."""
+    while True:
+        item = _TRACE_Q.get()
+        try:
+            generation = langfuse.start_observation(as_type="generation", **item)
+            generation.end()
+            if _TRACE_Q.empty():
+                langfuse.flush()
+        except Exception as e:
+            print(f"Warning: Failed to export Langfuse trace: {e}")
+        finally:
+            _TRACE_Q.task_done()
+
+
+if langfuse:
+    threading.Thread(target=_drain_traces, name="langfuse-trace-export", daemon=True).start()
+
+
+def _enqueue_trace(user_prompt: str, content: str, tokens_used):
+    """Queue a completed analysis for Langfuse export off the request path."""
+    if not langfuse:
+        return
+    item = {
+        "name": "analyze_contract",
+        "model": MODEL,
+        "input": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ],
+        "output": content,
+    }
+    if tokens_used is not None:
+        item["usage_details"] = {"total": tokens_used}
+    _TRACE_Q.put(item)
+
+
+def _enqueue_error_trace(detail: str, **inputs):
+    """Queue a failed analysis for Langfuse export, regardless of sampling."""
+    if not langfuse or not _TRACE_ERRORS:
+        return
+    _TRACE_Q.put({
+        "name": "analyze_contract",
+        "model": MODEL,
+        "input": inputs,
+        "level": "ERROR",
+        "status_message": detail,
+    })
+
+
+def _sampled_trace_hook():
+    """Return the completion trace hook if this call is sampled, otherwise None."""
+    if langfuse and random.random() < _TRACE_SAMPLE_RATE:
+        return _enqueue_trace
+    return None
+
+
+def _require_client():
+    """Return the OpenAI client or raise if the server isn't configured for it."""
     if not _API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set on server")
 
     client = _get_openai_client()
     if not client:
         raise HTTPException(status_code=500, detail="OpenAI client not available")
+    return client
 
-    trimmed = contract_text[:20000]  # basic guardrail
-    user_prompt = USER_PROMPT_TEMPLATE.format(role=role, risk=risk, contract=trimmed)
 
+def analyze_contract(contract_text: str, role: str, risk: str) -> AnalysisResponse:
+    """Analyze contract text using OpenAI and return structured response."""
+    client = _require_client()
     try:
-        completion = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.2,
+        return run_analysis(
+            client, MODEL, contract_text, role, risk,
+            on_completion=_sampled_trace_hook(), before_request=_throttle
         )
+    except HTTPException as e:
+        _enqueue_error_trace(str(e.detail), role=role, risk=risk, contract_chars=len(contract_text))
+        raise
 
-        content = completion.choices[0].message.content or ""
-        try:
-            m = re.search(r"\{[\s\S]*\}", content)
-            data = json.loads(m.group(0) if m else content)
-            summary = (data.get("summary") or "").strip()
-            red_flags = [str(x).strip() for x in (data.get("red_flags") or [])][:5]
-            pushbacks = [str(x).strip() for x in (data.get("pushbacks") or [])][:5]
-        except Exception:
-            summary, red_flags, pushbacks = content[:1000], [], []
-
-        tokens_used = None
-        try:
-            tokens_used = getattr(completion, "usage", None).total_tokens
-        except Exception:
-            pass
-
-        return AnalysisResponse(
-            summary=summary, 
-            red_flags=red_flags, 
-            pushbacks=pushbacks, 
-            tokens_used=tokens_used
+
+def analyze_contracts_batch(items: Sequence[AnalysisItem]) -> List[AnalysisResponse]:
+    """Analyze several (contract_text, role, risk) items, packing them into shared requests.
+
+    Results are returned in the same order as ``items``.
+    """
+    if not items:
+        return []
+    client = _require_client()
+    try:
+        return run_batch_analysis(
+            client, MODEL, items,
+            on_completion=_sampled_trace_hook(), before_request=_throttle
         )
-    except Exception as e:
-        print(f"Error in OpenAI analysis: {e}")
-        raise HTTPException(status_code=500, detail=f"OpenAI analysis failed: {str(e)}")
\ No newline at end of file
+    except HTTPException as e:
+        _enqueue_error_trace(str(e.detail), batch_size=len(items))
+        raise
@@ -1,50 +1,129 @@
 """PDF generation service for contract analysis reports."""
 
 import io
-from typing import List
+import tempfile
+from typing import BinaryIO, Iterator, List, Optional
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
+from reportlab.platypus import Flowable, SimpleDocTemplate, Paragraph, Spacer, ListFlowable
 from reportlab.lib.units import cm
 
 
-def generate_analysis_pdf(summary: str, red_flags: List[str], pushbacks: List[str]) -> bytes:
-    """Generate a PDF report from analysis results."""
-    buffer = io.BytesIO()
+# Chunk size used when streaming a rendered PDF back to the client
+PDF_CHUNK_SIZE = 64 * 1024
+
+# Rendered PDFs larger than this spill from memory to a temporary file
+PDF_SPOOL_MAX_SIZE = 1024 * 1024
+
+# Paragraph styles, built once at import instead of per report
+_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = _STYLES['Title']
+_HEADING_STYLE = _STYLES['Heading2']
+_BODY_STYLE = _STYLES['BodyText']
+
+
+class LazyBullet(Flowable):
+    """List item whose Paragraph is only built when ReportLab lays it out.
+
+    The source text is dropped once the Paragraph exists, and the Paragraph
+    itself is released after it has been drawn.
+    """
+
+    def __init__(self, text: str, style):
+        Flowable.__init__(self)
+        self._text = text
+        self._style = style
+        self._paragraph = None
+
+    def _get_paragraph(self) -> Paragraph:
+        if self._paragraph is None:
+            self._paragraph = Paragraph(self._text, self._style)
+            self._text = None
+        return self._paragraph
+
+    def wrap(self, availWidth, availHeight):
+        self.width, self.height = self._get_paragraph().wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        return self._get_paragraph().split(availWidth, availHeight)
+
+    def getSpaceBefore(self):
+        return self._style.spaceBefore
+
+    def getSpaceAfter(self):
+        return self._style.spaceAfter
+
+    def draw(self):
+        self._get_paragraph().drawOn(self.canv, 0, 0)
+        self._paragraph = None
+
+
+def generate_analysis_pdf(
+    summary: str,
+    red_flags: List[str],
+    pushbacks: List[str],
+    out_stream: Optional[BinaryIO] = None
+) -> Optional[bytes]:
+    """Generate a PDF report from analysis results.
+
+    When ``out_stream`` is given the PDF is written straight into it and
+    nothing is returned; otherwise the PDF is returned as bytes.
+    """
+    if out_stream is None:
+        buffer = io.BytesIO()
+        generate_analysis_pdf(summary, red_flags, pushbacks, buffer)
+        return buffer.getvalue()
+
     doc = SimpleDocTemplate(
-        buffer, 
+        out_stream, 
         pagesize=A4, 
         leftMargin=2*cm, 
         rightMargin=2*cm, 
         topMargin=2*cm, 
         bottomMargin=2*cm
     )
-    styles = getSampleStyleSheet()
     story = []
 
     # Title
-    story.append(Paragraph("<b>Lindle Contract Analysis</b>", styles['Title']))
+    story.append(Paragraph("<b>Lindle Contract Analysis</b>", _TITLE_STYLE))
     story.append(Spacer(1, 12))
 
     # Summary section
-    story.append(Paragraph("<b>Summary</b>", styles['Heading2']))
-    story.append(Paragraph(summary.replace('\n', '<br/>'), styles['BodyText']))
+    story.append(Paragraph("<b>Summary</b>", _HEADING_STYLE))
+    story.append(Paragraph(escape(summary).replace('\n', '<br/>'), _BODY_STYLE))
     story.append(Spacer(1, 10))
 
     # Red flags section
-    story.append(Paragraph("<b>Top 5 Red Flags</b>", styles['Heading2']))
+    story.append(Paragraph("<b>Top 5 Red Flags</b>", _HEADING_STYLE))
     story.append(ListFlowable([
-        ListItem(Paragraph(x, styles['BodyText'])) for x in red_flags
+        LazyBullet(escape(x), _BODY_STYLE) for x in red_flags
     ], bulletType='bullet'))
     story.append(Spacer(1, 10))
 
     # Pushbacks section
-    story.append(Paragraph("<b>Suggested Pushbacks</b>", styles['Heading2']))
+    story.append(Paragraph("<b>Suggested Pushbacks</b>", _HEADING_STYLE))
     story.append(ListFlowable([
-        ListItem(Paragraph(x, styles['BodyText'])) for x in pushbacks
+        LazyBullet(escape(x), _BODY_STYLE) for x in pushbacks
     ], bulletType='bullet'))
 
     doc.build(story)
-    pdf_data = buffer.getvalue()
-    buffer.close()
-    return pdf_data
\ No newline at end of file
+    return None
+
+
+def iter_analysis_pdf(
+    summary: str,
+    red_flags: List[str],
+    pushbacks: List[str],
+    chunk_size: int = PDF_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Render the PDF into a spooled temporary file and yield it in chunks."""
+    with tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE) as spool:
+        generate_analysis_pdf(summary, red_flags, pushbacks, spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,47 @@
+"""Client-side rate limiting for OpenAI requests."""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously from a monotonic clock.
+
+    ``rate`` is the number of tokens added per second and ``capacity`` the
+    largest burst the bucket can hold. ``acquire`` blocks until enough tokens
+    are available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1, timeout: Optional[float] = None) -> bool:
+        """Take ``amount`` tokens, waiting for refills; return False on timeout."""
+        # A request larger than the whole bucket would never fit, so cap it
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
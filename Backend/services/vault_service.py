@@ -1,13 +1,28 @@
 """Vault service for managing personal clause vault data."""
 
-import json
+import asyncio
+import atexit
+import functools
 import os
+import threading
+import time
 import uuid
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import TypeAdapter
+
+# Inter-process file locks (POSIX only); without them compaction is only safe for one process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 from models.vault import (
-    VaultData, ClauseCategory, Clause, SharingSettings, 
+    VaultData, ClauseCategory, Clause, ContractorInfo, SharingSettings, 
     PreferenceLevel, ClauseCreateRequest, ClauseUpdateRequest,
     CategoryCreateRequest, CategoryUpdateRequest
 )
@@ -17,57 +32,447 @@ from models.vault import (
 DATA_DIR = "data"
 VAULTS_FILE = os.path.join(DATA_DIR, "vaults.json")
 
+# Changes since the last full write of VAULTS_FILE are appended to this
+# newline-delimited JSON log: one vault per line, or {"_delete": user_id}.
+# The first line, {"_snapshot": crc32}, names the snapshot the log applies to,
+# so a log left behind by an interrupted compaction is never replayed.
+VAULT_LOG_SUFFIX = ".log"
+
+# Lock file serializing log appends and compactions across processes
+VAULT_LOCK_SUFFIX = ".lock"
+
+# The log is compacted into VAULTS_FILE once it grows past this multiple of
+# the snapshot's size (and past the minimum, so small stores aren't rewritten)
+VAULT_LOG_COMPACT_RATIO = 2
+VAULT_LOG_MIN_COMPACT_BYTES = 64 * 1024
+
 
 def ensure_data_dir():
     """Ensure data directory exists."""
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def load_vaults() -> List[VaultData]:
-    """Load all vaults from JSON file."""
+# Delay before a mutation is written to disk, so bursts of updates share one write
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+# In-memory index of vaults by user_id for the file at _INDEX_PATH. Mutations
+# update it in place and mark the vault pending; a background writer logs it.
+_VAULT_INDEX: Dict[str, VaultData] = {}
+_INDEX_PATH: Optional[str] = None
+# (mtime_ns, size) of _INDEX_PATH and its log as of our last load or write;
+# a different signature means another process wrote the files
+_INDEX_SIGNATURE: Tuple[Optional[Tuple[int, int]], ...] = ()
+_INDEX_LOCK = threading.RLock()
+_save_requested = threading.Event()
+
+# user_ids changed since the last flush, in change order (dict as ordered set)
+_PENDING: Dict[str, None] = {}
+
+# Validates the whole vaults file in one pass straight from the raw JSON bytes
+_VAULTS_ADAPTER = TypeAdapter(List[VaultData])
+
+# Serializes a vault straight to JSON bytes in one pass, without an intermediate dict
+_VAULT_ADAPTER = TypeAdapter(VaultData)
+
+# Serialized JSON of each indexed vault by user_id, dropped when that vault changes
+_SERIALIZED: Dict[str, bytes] = {}
+
+# Sharing indexes for get_accessible_vaults, kept in step with the vault index.
+# Vaults are keyed by their owner's user_id; dicts act as insertion-ordered sets.
+_PUBLIC_VAULT_IDS: Dict[str, None] = {}
+_SHARED_WITH: Dict[str, Dict[str, None]] = {}
+_SHARED_TARGETS: Dict[str, Tuple[str, ...]] = {}
+
+
+def _replay_vault_log(vaults: List[VaultData], log_data: bytes) -> List[VaultData]:
+    """Apply the change log on top of the snapshot's vaults, last writer wins."""
+    if not log_data:
+        return vaults
+    latest = {vault.user_id: vault for vault in vaults}
+    for line in log_data.splitlines():
+        try:
+            record = orjson.loads(line)
+            if "_snapshot" in record:
+                continue
+            if "_delete" in record:
+                latest.pop(record["_delete"], None)
+            else:
+                latest[record["user_id"]] = record
+        except Exception:
+            # A torn final line from an interrupted append
+            continue
+    # Validate the logged vaults in one pass; snapshot vaults are already models
+    pending = [(user_id, data) for user_id, data in latest.items() if isinstance(data, dict)]
+    for (user_id, _), vault in zip(pending, _VAULTS_ADAPTER.validate_python([data for _, data in pending])):
+        latest[user_id] = vault
+    return list(latest.values())
+
+
+def _log_snapshot_crc(log_data: bytes) -> Optional[int]:
+    """Return the snapshot checksum from the change log's header line, if it has one."""
+    try:
+        header = orjson.loads(log_data.split(b"\n", 1)[0])
+        return header["_snapshot"]
+    except Exception:
+        return None
+
+
+def _vaults_from_bytes(path: str, snapshot_data: Optional[bytes], log_data: Optional[bytes]) -> List[VaultData]:
+    """Build the vaults from the raw snapshot and change log read from path."""
+    vaults = _VAULTS_ADAPTER.validate_json(snapshot_data) if snapshot_data else []
+    if log_data:
+        log_crc = _log_snapshot_crc(log_data)
+        if log_crc is not None and log_crc != zlib.crc32(snapshot_data or b""):
+            print(f"Ignoring change log of {path}: it predates the current snapshot")
+        else:
+            vaults = _replay_vault_log(vaults, log_data)
+    return vaults
+
+
+def _read_optional(path: str) -> Optional[bytes]:
+    """Return the bytes of the file at path, or None if it does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _read_vaults_file(path: Optional[str] = None) -> List[VaultData]:
+    """Read all vaults from the JSON file (VAULTS_FILE by default) and replay its change log.
+
+    Missing files mean no vaults; a file that cannot be parsed raises, so a
+    damaged snapshot is never mistaken for an empty store and written back.
+    """
+    path = path or VAULTS_FILE
     ensure_data_dir()
-    if not os.path.exists(VAULTS_FILE):
-        return []
     try:
-        with open(VAULTS_FILE, 'r') as f:
-            data = json.load(f)
-            return [VaultData(**vault) for vault in data]
+        return _vaults_from_bytes(path, _read_optional(path), _read_optional(path + VAULT_LOG_SUFFIX))
+    except Exception as e:
+        print(f"Error loading vaults from {path}: {e}")
+        raise
+
+
+def _serialize_vault(vault: VaultData) -> bytes:
+    """Serialize a vault to JSON, reusing the cached bytes if it is unchanged."""
+    data = _SERIALIZED.get(vault.user_id)
+    if data is None:
+        data = _VAULT_ADAPTER.dump_json(vault, indent=2)
+        _SERIALIZED[vault.user_id] = data
+    return data
+
+
+def _write_vaults_file(path: str, vaults: List[VaultData]):
+    """Atomically write vaults to the JSON file at path and drop its change log.
+
+    The directory must already exist; a removed data directory is never recreated here.
+    """
+    if vaults:
+        data = b"[\n" + b",\n".join(_serialize_vault(vault) for vault in vaults) + b"\n]"
+    else:
+        data = b"[]"
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        # Make sure the new snapshot is on disk before it replaces the old one
+        f.flush()
+        os.fsync(f.fileno())
+    log_path = path + VAULT_LOG_SUFFIX
+    if _read_log_snapshot_crc(log_path) == zlib.crc32(data):
+        # The log was started on identical snapshot bytes, so its header could not
+        # tell the two apart after the swap; drop it first while the old snapshot
+        # (with the same content) is still in place
+        _remove_file(log_path)
+    os.replace(tmp_path, path)
+    # The snapshot now holds every logged change; if we stop before this, the
+    # log's header no longer matches the snapshot and it is ignored on load
+    _remove_file(log_path)
+
+
+def _remove_file(path: str):
+    """Delete path if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_log_snapshot_crc(log_path: str) -> Optional[int]:
+    """Return the snapshot checksum recorded in the change log at log_path, if any."""
+    try:
+        with open(log_path, 'rb') as f:
+            return _log_snapshot_crc(f.readline())
+    except OSError:
+        return None
+
+
+def _append_vault_log(path: str, changes: List[Tuple[str, Optional[VaultData]]]) -> int:
+    """Append changed vaults (None for deleted) to the change log of path.
+
+    A new log starts with a header naming the snapshot it applies to. The
+    directory must already exist. Returns the number of bytes appended.
+    """
+    lines = [
+        _VAULT_ADAPTER.dump_json(vault) if vault is not None else orjson.dumps({"_delete": user_id})
+        for user_id, vault in changes
+    ]
+    data = b"\n".join(lines) + b"\n"
+    with open(path + VAULT_LOG_SUFFIX, 'ab') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            try:
+                with open(path, 'rb') as snapshot:
+                    snapshot_crc = zlib.crc32(snapshot.read())
+            except FileNotFoundError:
+                snapshot_crc = zlib.crc32(b"")
+            data = orjson.dumps({"_snapshot": snapshot_crc}) + b"\n" + data
+        f.write(data)
+    return len(data)
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive inter-process lock for the vaults file at path."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + VAULT_LOCK_SUFFIX, 'ab') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _needs_compaction(path: str, log_size: int) -> bool:
+    """Return whether the change log has outgrown the snapshot at path."""
+    try:
+        snapshot_size = os.path.getsize(path)
+    except OSError:
+        snapshot_size = 0
+    return log_size > VAULT_LOG_COMPACT_RATIO * max(snapshot_size, VAULT_LOG_MIN_COMPACT_BYTES)
+
+
+def _unindex_sharing(user_id: str):
+    """Remove a vault from the sharing indexes."""
+    _PUBLIC_VAULT_IDS.pop(user_id, None)
+    for target in _SHARED_TARGETS.pop(user_id, ()):
+        shared = _SHARED_WITH.get(target)
+        if shared is not None:
+            shared.pop(user_id, None)
+            if not shared:
+                del _SHARED_WITH[target]
+
+
+def _index_sharing(vault: VaultData):
+    """Add or refresh a vault in the sharing indexes."""
+    _unindex_sharing(vault.user_id)
+    if vault.sharing_settings.is_public:
+        _PUBLIC_VAULT_IDS[vault.user_id] = None
+    targets = tuple(vault.sharing_settings.shared_with_users)
+    _SHARED_TARGETS[vault.user_id] = targets
+    for target in targets:
+        _SHARED_WITH.setdefault(target, {})[vault.user_id] = None
+
+
+def _rebuild_sharing_indexes():
+    """Rebuild the sharing indexes from the whole vault index."""
+    _PUBLIC_VAULT_IDS.clear()
+    _SHARED_WITH.clear()
+    _SHARED_TARGETS.clear()
+    for vault in _VAULT_INDEX.values():
+        _index_sharing(vault)
+
+
+def _file_signature(path: str) -> Tuple[Optional[Tuple[int, int]], ...]:
+    """Return the (mtime_ns, size) of the vaults file at path and of its change log."""
+    signature = []
+    for file_path in (path, path + VAULT_LOG_SUFFIX):
+        try:
+            stat = os.stat(file_path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _install_index(path: str, vaults: List[VaultData], signature: Tuple[Optional[Tuple[int, int]], ...]):
+    """Replace the index with the given vaults loaded from path."""
+    global _INDEX_PATH, _INDEX_SIGNATURE
+    _flush_pending_save()
+    _VAULT_INDEX.clear()
+    _SERIALIZED.clear()
+    _VAULT_INDEX.update((vault.user_id, vault) for vault in vaults)
+    _rebuild_sharing_indexes()
+    _INDEX_PATH = path
+    _INDEX_SIGNATURE = signature
+
+
+def _vault_index() -> Dict[str, VaultData]:
+    """Return the vault index for the current VAULTS_FILE.
+
+    The file is only parsed on first use or after another process has
+    written it; otherwise reads are served from memory.
+    """
+    with _INDEX_LOCK:
+        if _INDEX_PATH != VAULTS_FILE or _file_signature(VAULTS_FILE) != _INDEX_SIGNATURE:
+            try:
+                # Log our own pending changes first so the reload includes them
+                _flush_pending_save()
+                signature = _file_signature(VAULTS_FILE)
+                vaults = _read_vaults_file()
+            except Exception:
+                if _INDEX_PATH != VAULTS_FILE:
+                    raise
+                # Keep serving the last good index; the next read tries the file again
+                return _VAULT_INDEX
+            _install_index(VAULTS_FILE, vaults, signature)
+        return _VAULT_INDEX
+
+
+async def warm_vault_index():
+    """Load the vault index in a worker thread so requests never block on the first read."""
+    path = VAULTS_FILE
+    with _INDEX_LOCK:
+        if _INDEX_PATH == path:
+            return
+    signature = _file_signature(path)
+    try:
+        vaults = await asyncio.to_thread(_read_vaults_file, path)
     except Exception:
-        return []
+        # Leave the index unloaded; vault requests retry the read and report the error
+        return
+    with _INDEX_LOCK:
+        # A request may have loaded the index synchronously while we were reading
+        if _INDEX_PATH != path:
+            _install_index(path, vaults, signature)
+
+
+def _schedule_save(user_id: str):
+    """Mark a user's vault as changed and wake the background writer."""
+    _SERIALIZED.pop(user_id, None)
+    vault = _VAULT_INDEX.get(user_id)
+    if vault is not None:
+        _index_sharing(vault)
+    else:
+        _unindex_sharing(user_id)
+    _PENDING[user_id] = None
+    _save_requested.set()
+
+
+def _merge_outside_changes():
+    """Reload the index from disk after another process wrote it, keeping unsaved local changes on top."""
+    # Read first: if the files can't be parsed this raises and leaves the index untouched
+    vaults = _read_vaults_file(_INDEX_PATH)
+    local = {user_id: _VAULT_INDEX.get(user_id) for user_id in _PENDING}
+    _VAULT_INDEX.clear()
+    _SERIALIZED.clear()
+    _VAULT_INDEX.update((vault.user_id, vault) for vault in vaults)
+    for user_id, vault in local.items():
+        if vault is None:
+            _VAULT_INDEX.pop(user_id, None)
+        else:
+            _VAULT_INDEX[user_id] = vault
+    _rebuild_sharing_indexes()
+
+
+def _flush_pending_save():
+    """Append unsaved changes to the log now, compacting it if it has grown too large."""
+    global _INDEX_SIGNATURE
+    with _INDEX_LOCK:
+        if not _PENDING:
+            return
+        # Another process must not compact or append between our check and our write
+        with _file_lock(_INDEX_PATH):
+            signature = _file_signature(_INDEX_PATH)
+            if signature != _INDEX_SIGNATURE:
+                print(f"Vaults file {_INDEX_PATH} changed on disk, reloading before saving")
+                # Raises on a damaged file, keeping the changes pending and the files as they are
+                _merge_outside_changes()
+                _INDEX_SIGNATURE = signature
+            changes = [(user_id, _VAULT_INDEX.get(user_id)) for user_id in _PENDING]
+            appended = _append_vault_log(_INDEX_PATH, changes)
+            _PENDING.clear()
+            after = _file_signature(_INDEX_PATH)
+            log_size = after[1][1] if after[1] else 0
+            # Only treat the files as seen if our append was the sole change since the check;
+            # otherwise keep the old signature so the next read reloads the other writer's records
+            expected_log_size = (signature[1][1] if signature[1] else 0) + (appended or 0)
+            if after[0] != signature[0] or log_size != expected_log_size:
+                return
+            _INDEX_SIGNATURE = after
+            # The index now matches the files exactly, so it is safe to rewrite the snapshot from it
+            if appended and _needs_compaction(_INDEX_PATH, log_size):
+                _write_vaults_file(_INDEX_PATH, list(_VAULT_INDEX.values()))
+                _INDEX_SIGNATURE = _file_signature(_INDEX_PATH)
+
+
+def _save_worker():
+    """Persist the index shortly after each burst of mutations."""
+    while True:
+        _save_requested.wait()
+        time.sleep(SAVE_DEBOUNCE_SECONDS)
+        _save_requested.clear()
+        try:
+            _flush_pending_save()
+        except Exception as e:
+            print(f"Error saving vaults: {e}")
+
+
+threading.Thread(target=_save_worker, name="vault-save", daemon=True).start()
+atexit.register(_flush_pending_save)
+
+
+def _with_index_lock(func):
+    """Run a vault mutation while holding the index lock."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _INDEX_LOCK:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def load_vaults() -> List[VaultData]:
+    """Load all vaults."""
+    return list(_vault_index().values())
 
 
 def save_vaults(vaults: List[VaultData]):
-    """Save vaults to JSON file."""
-    ensure_data_dir()
-    with open(VAULTS_FILE, 'w') as f:
-        json.dump([vault.model_dump() for vault in vaults], f, indent=2)
+    """Replace all vaults and save them to the JSON file immediately, compacting the log."""
+    global _INDEX_SIGNATURE
+    with _INDEX_LOCK:
+        index = _vault_index()
+        index.clear()
+        index.update((vault.user_id, vault) for vault in vaults)
+        _SERIALIZED.clear()
+        _rebuild_sharing_indexes()
+        ensure_data_dir()
+        with _file_lock(VAULTS_FILE):
+            _write_vaults_file(VAULTS_FILE, vaults)
+        _PENDING.clear()
+        _INDEX_SIGNATURE = _file_signature(VAULTS_FILE)
 
 
 def get_vault_by_user_id(user_id: str) -> Optional[VaultData]:
     """Get vault data for a specific user."""
-    vaults = load_vaults()
-    for vault in vaults:
-        if vault.user_id == user_id:
-            return vault
-    return None
+    return _vault_index().get(user_id)
 
 
+@_with_index_lock
 def create_or_update_vault(
     user_id: str,
     clause_categories: Optional[List[ClauseCategory]] = None,
-    sharing_settings: Optional[SharingSettings] = None
+    sharing_settings: Optional[SharingSettings] = None,
+    stake: Optional[str] = None,
+    availability: Optional[str] = None,
+    potential_contractors: Optional[List[ContractorInfo]] = None
 ) -> VaultData:
-    """Create a new vault or update existing one for a user."""
-    vaults = load_vaults()
-    existing_vault = None
-    vault_index = -1
-    
-    # Find existing vault for this user
-    for i, vault in enumerate(vaults):
-        if vault.user_id == user_id:
-            existing_vault = vault
-            vault_index = i
-            break
+    """Create a new vault or update existing one for a user.
+
+    Arguments left as None keep the vault's current value (or the default
+    for a new vault).
+    """
+    index = _vault_index()
+    existing_vault = index.get(user_id)
     
     current_time = datetime.now().isoformat()
     
@@ -76,24 +481,29 @@ def create_or_update_vault(
         updated_vault = VaultData(
             user_id=user_id,
             clause_categories=clause_categories if clause_categories is not None else existing_vault.clause_categories,
+            stake=stake if stake is not None else existing_vault.stake,
+            availability=availability if availability is not None else existing_vault.availability,
+            potential_contractors=potential_contractors if potential_contractors is not None else existing_vault.potential_contractors,
             sharing_settings=sharing_settings if sharing_settings is not None else existing_vault.sharing_settings,
             created_at=existing_vault.created_at,
             updated_at=current_time
         )
-        vaults[vault_index] = updated_vault
     else:
         # Create new vault with default categories
         default_categories = _create_default_categories()
         updated_vault = VaultData(
             user_id=user_id,
             clause_categories=clause_categories or default_categories,
+            stake=stake or "",
+            availability=availability or "",
+            potential_contractors=potential_contractors or [],
             sharing_settings=sharing_settings or SharingSettings(),
             created_at=current_time,
             updated_at=current_time
         )
-        vaults.append(updated_vault)
     
-    save_vaults(vaults)
+    index[user_id] = updated_vault
+    _schedule_save(user_id)
     return updated_vault
 
 
@@ -147,6 +557,18 @@ def _create_default_categories() -> List[ClauseCategory]:
     return default_categories
 
 
+def _locate_category(user_id: str, category_id: str) -> Tuple[Optional[VaultData], Optional[ClauseCategory]]:
+    """Find a user's vault and one of its categories in a single lookup."""
+    vault = get_vault_by_user_id(user_id)
+    if not vault:
+        return None, None
+    for category in vault.clause_categories:
+        if category.id == category_id:
+            return vault, category
+    return vault, None
+
+
+@_with_index_lock
 def add_category_to_vault(user_id: str, request: CategoryCreateRequest) -> ClauseCategory:
     """Add a new category to a user's vault."""
     vault = get_vault_by_user_id(user_id)
@@ -165,30 +587,16 @@ def add_category_to_vault(user_id: str, request: CategoryCreateRequest) -> Claus
     
     vault.clause_categories.append(new_category)
     vault.updated_at = current_time
-    
-    # Save the updated vault
-    vaults = load_vaults()
-    for i, v in enumerate(vaults):
-        if v.user_id == user_id:
-            vaults[i] = vault
-            break
-    
-    save_vaults(vaults)
+    _schedule_save(user_id)
     return new_category
 
 
+@_with_index_lock
 def update_category(user_id: str, category_id: str, request: CategoryUpdateRequest) -> ClauseCategory:
     """Update an existing category in a user's vault."""
-    vault = get_vault_by_user_id(user_id)
+    vault, category = _locate_category(user_id, category_id)
     if not vault:
         raise ValueError("Vault not found for user")
-    
-    category = None
-    for cat in vault.clause_categories:
-        if cat.id == category_id:
-            category = cat
-            break
-    
     if not category:
         raise ValueError("Category not found")
     
@@ -202,54 +610,32 @@ def update_category(user_id: str, category_id: str, request: CategoryUpdateReque
     
     category.updated_at = current_time
     vault.updated_at = current_time
-    
-    # Save the updated vault
-    vaults = load_vaults()
-    for i, v in enumerate(vaults):
-        if v.user_id == user_id:
-            vaults[i] = vault
-            break
-    
-    save_vaults(vaults)
+    _schedule_save(user_id)
     return category
 
 
+@_with_index_lock
 def delete_category(user_id: str, category_id: str) -> bool:
     """Delete a category from a user's vault."""
     vault = get_vault_by_user_id(user_id)
     if not vault:
         return False
     
-    original_count = len(vault.clause_categories)
-    vault.clause_categories = [cat for cat in vault.clause_categories if cat.id != category_id]
-    
-    if len(vault.clause_categories) < original_count:
-        vault.updated_at = datetime.now().isoformat()
-        
-        # Save the updated vault
-        vaults = load_vaults()
-        for i, v in enumerate(vaults):
-            if v.user_id == user_id:
-                vaults[i] = vault
-                break
-        
-        save_vaults(vaults)
-        return True
+    for i, cat in enumerate(vault.clause_categories):
+        if cat.id == category_id:
+            vault.clause_categories.pop(i)
+            vault.updated_at = datetime.now().isoformat()
+            _schedule_save(user_id)
+            return True
     return False
 
 
+@_with_index_lock
 def add_clause_to_category(user_id: str, category_id: str, request: ClauseCreateRequest) -> Clause:
     """Add a new clause to a category in a user's vault."""
-    vault = get_vault_by_user_id(user_id)
+    vault, category = _locate_category(user_id, category_id)
     if not vault:
         raise ValueError("Vault not found for user")
-    
-    category = None
-    for cat in vault.clause_categories:
-        if cat.id == category_id:
-            category = cat
-            break
-    
     if not category:
         raise ValueError("Category not found")
     
@@ -267,30 +653,16 @@ def add_clause_to_category(user_id: str, category_id: str, request: ClauseCreate
     category.clauses.append(new_clause)
     category.updated_at = current_time
     vault.updated_at = current_time
-    
-    # Save the updated vault
-    vaults = load_vaults()
-    for i, v in enumerate(vaults):
-        if v.user_id == user_id:
-            vaults[i] = vault
-            break
-    
-    save_vaults(vaults)
+    _schedule_save(user_id)
     return new_clause
 
 
+@_with_index_lock
 def update_clause(user_id: str, category_id: str, clause_id: str, request: ClauseUpdateRequest) -> Clause:
     """Update an existing clause in a user's vault."""
-    vault = get_vault_by_user_id(user_id)
+    vault, category = _locate_category(user_id, category_id)
     if not vault:
         raise ValueError("Vault not found for user")
-    
-    category = None
-    for cat in vault.clause_categories:
-        if cat.id == category_id:
-            category = cat
-            break
-    
     if not category:
         raise ValueError("Category not found")
     
@@ -318,49 +690,25 @@ def update_clause(user_id: str, category_id: str, clause_id: str, request: Claus
     clause.updated_at = current_time
     category.updated_at = current_time
     vault.updated_at = current_time
-    
-    # Save the updated vault
-    vaults = load_vaults()
-    for i, v in enumerate(vaults):
-        if v.user_id == user_id:
-            vaults[i] = vault
-            break
-    
-    save_vaults(vaults)
+    _schedule_save(user_id)
     return clause
 
 
+@_with_index_lock
 def delete_clause(user_id: str, category_id: str, clause_id: str) -> bool:
     """Delete a clause from a category in a user's vault."""
-    vault = get_vault_by_user_id(user_id)
-    if not vault:
-        return False
-    
-    category = None
-    for cat in vault.clause_categories:
-        if cat.id == category_id:
-            category = cat
-            break
-    
+    vault, category = _locate_category(user_id, category_id)
     if not category:
         return False
     
-    original_count = len(category.clauses)
-    category.clauses = [cl for cl in category.clauses if cl.id != clause_id]
-    
-    if len(category.clauses) < original_count:
-        category.updated_at = datetime.now().isoformat()
-        vault.updated_at = datetime.now().isoformat()
-        
-        # Save the updated vault
-        vaults = load_vaults()
-        for i, v in enumerate(vaults):
-            if v.user_id == user_id:
-                vaults[i] = vault
-                break
-        
-        save_vaults(vaults)
-        return True
+    for i, cl in enumerate(category.clauses):
+        if cl.id == clause_id:
+            category.clauses.pop(i)
+            current_time = datetime.now().isoformat()
+            category.updated_at = current_time
+            vault.updated_at = current_time
+            _schedule_save(user_id)
+            return True
     return False
 
 
@@ -372,63 +720,49 @@ def search_clauses(user_id: str, query: str = "", tags: List[str] = None, prefer
     
     matching_clauses = []
     query_lower = query.lower() if query else ""
+    tags_lower = [tag.lower() for tag in tags or []]
     
     for category in vault.clause_categories:
         for clause in category.clauses:
-            # Check if clause matches the search criteria
-            matches = True
+            # Preference level filtering
+            if preference_level and clause.preference_level != preference_level:
+                continue
             
             # Text search in title or content
-            if query_lower:
-                if (query_lower not in clause.title.lower() and 
-                    query_lower not in clause.content.lower()):
-                    matches = False
+            if query_lower and query_lower not in clause.title.lower() and query_lower not in clause.content.lower():
+                continue
             
             # Tag filtering
-            if tags and matches:
-                clause_tags_lower = [tag.lower() for tag in clause.tags]
-                for tag in tags:
-                    if tag.lower() not in clause_tags_lower:
-                        matches = False
-                        break
+            if tags_lower:
+                clause_tags_lower = {tag.lower() for tag in clause.tags}
+                if not all(tag in clause_tags_lower for tag in tags_lower):
+                    continue
             
-            # Preference level filtering
-            if preference_level and matches:
-                if clause.preference_level != preference_level:
-                    matches = False
-            
-            if matches:
-                matching_clauses.append(clause)
+            matching_clauses.append(clause)
     
     return matching_clauses
 
 
 def get_accessible_vaults(user_id: Optional[str] = None) -> List[VaultData]:
     """Get vaults that are accessible to a user (public + shared with user + own)."""
-    vaults = load_vaults()
-    accessible_vaults = []
-    
-    for vault in vaults:
+    with _INDEX_LOCK:
+        index = _vault_index()
         # Public vaults are accessible to everyone
-        if vault.sharing_settings.is_public:
-            accessible_vaults.append(vault)
+        if not user_id:
+            return [index[vault_id] for vault_id in _PUBLIC_VAULT_IDS]
+        accessible_ids = dict(_PUBLIC_VAULT_IDS)
         # User's own vault
-        elif user_id and vault.user_id == user_id:
-            accessible_vaults.append(vault)
+        if user_id in index:
+            accessible_ids[user_id] = None
         # Vaults shared with the user
-        elif user_id and user_id in vault.sharing_settings.shared_with_users:
-            accessible_vaults.append(vault)
-    
-    return accessible_vaults
+        accessible_ids.update(_SHARED_WITH.get(user_id, {}))
+        return [index[vault_id] for vault_id in accessible_ids]
 
 
+@_with_index_lock
 def delete_vault(user_id: str) -> bool:
     """Delete a user's vault."""
-    vaults = load_vaults()
-    original_count = len(vaults)
-    vaults = [vault for vault in vaults if vault.user_id != user_id]
-    
-    if len(vaults) < original_count:
-        save_vaults(vaults)
-        return True
-    return False
\ No newline at end of file
+    if _vault_index().pop(user_id, None) is None:
+        return False
+    _schedule_save(user_id)
+    return True
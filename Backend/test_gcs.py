@@ -4,6 +4,7 @@ Test script for Google Cloud Storage service.
 Run this to verify GCS connectivity and file upload functionality.
 """
 
+import asyncio
 import os
 from services.gcs_service import gcs_service
 
@@ -23,41 +24,52 @@ def test_gcs_connection():
     print(f"Bucket: {gcs_service.bucket_name}")
     return True
 
-def test_file_upload():
-    """Test file upload functionality."""
-    print("\nTesting file upload...")
-    
-    # Create a test file content
-    test_content = b"This is a test file content for GCS upload testing."
-    test_filename = "test_file.txt"
+# Number of upload -> URL -> delete round trips run concurrently
+UPLOAD_COUNT = int(os.getenv("GCS_TEST_UPLOADS", "3"))
+
+async def _upload_and_verify(index):
+    """Upload one test file, check its URL and delete it again."""
+    test_content = f"This is test file {index} content for GCS upload testing.".encode()
+    test_filename = f"test_file_{index}.txt"
     
-    # Upload the test file
-    gcs_path = gcs_service.upload_file(
+    # The storage client is blocking, so run its calls on worker threads
+    gcs_path = await asyncio.to_thread(
+        gcs_service.upload_file,
         file_content=test_content,
         file_name=test_filename,
         content_type="text/plain"
     )
     
-    if gcs_path:
-        print(f"✅ File uploaded successfully: {gcs_path}")
-        
-        # Get the file URL
-        file_url = gcs_service.get_file_url(gcs_path)
-        if file_url:
-            print(f"✅ File URL: {file_url}")
-        else:
-            print("❌ Could not get file URL")
-        
-        # Clean up - delete the test file
-        if gcs_service.delete_file(gcs_path):
-            print(f"✅ Test file deleted: {gcs_path}")
-        else:
-            print(f"❌ Could not delete test file: {gcs_path}")
-        
-        return True
-    else:
-        print("❌ File upload failed")
+    if not gcs_path:
+        print(f"❌ File upload failed: {test_filename}")
         return False
+    
+    print(f"✅ File uploaded successfully: {gcs_path}")
+    
+    # Get the file URL (built locally, no round trip)
+    file_url = gcs_service.get_file_url(gcs_path)
+    if file_url:
+        print(f"✅ File URL: {file_url}")
+    else:
+        print("❌ Could not get file URL")
+    
+    # Clean up - delete the test file
+    if await asyncio.to_thread(gcs_service.delete_file, gcs_path):
+        print(f"✅ Test file deleted: {gcs_path}")
+    else:
+        print(f"❌ Could not delete test file: {gcs_path}")
+    
+    return True
+
+async def _upload_all():
+    """Run all upload round trips concurrently over the shared GCS client."""
+    results = await asyncio.gather(*(_upload_and_verify(i) for i in range(UPLOAD_COUNT)))
+    return all(results)
+
+def test_file_upload():
+    """Test file upload functionality."""
+    print(f"\nTesting file upload ({UPLOAD_COUNT} concurrent uploads)...")
+    return asyncio.run(_upload_all())
 
 def main():
     """Main test function."""
@@ -0,0 +1,26 @@
+"""Shared fixtures for the Backend test suite."""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Import the FastAPI app once per test session (or xdist worker)."""
+    from main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    """Create one test client for the session, with startup events already run."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def created_time():
+    """Fixed ISO timestamp for created_at/updated_at, so test data is deterministic."""
+    return datetime(2024, 1, 1).isoformat()
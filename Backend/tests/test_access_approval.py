@@ -1,53 +1,73 @@
 """Tests for Document Access Approval API routes."""
 
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, patch
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
 from datetime import datetime
 
-from main import app
+from routes.access_approval import get_document_access_service
 from models.access_approval import AccessRequest, Document, User, AccessRequestStatus
 
-client = TestClient(app)
-
-
-@pytest.fixture
+# Every test shares the module's event loop so the async client can be reused
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Fixed timestamp so test data is identical across tests and runs
+_FIXED_TS = datetime(2024, 1, 1)
+
+
+# Mock data, built once for the module
+_USER = User(id=1, name="John Doe", email="john@example.com")
+_DOCUMENT = Document(id=1, title="Test Document", owner_id=2)
+_ACCESS_REQUEST = AccessRequest(
+    id=1,
+    user_id=1,
+    document_id=1,
+    status=AccessRequestStatus.PENDING,
+    requested_at=_FIXED_TS,
+    user=_USER,
+    document=_DOCUMENT
+)
+
+# Mock DocumentAccessService shared by every test in the module
+_SHARED_MOCK = AsyncMock()
+_SHARED_MOCK.get_access_requests.return_value = [_ACCESS_REQUEST]
+_SHARED_MOCK.enrich_access_requests.return_value = [_ACCESS_REQUEST]
+_SHARED_MOCK.create_access_request.return_value = _ACCESS_REQUEST
+_SHARED_MOCK.make_decision.return_value = _ACCESS_REQUEST
+_SHARED_MOCK.get_documents.return_value = [_DOCUMENT]
+_SHARED_MOCK.get_document_by_id.return_value = _DOCUMENT
+_SHARED_MOCK.get_users.return_value = [_USER]
+_SHARED_MOCK.get_user_by_id.return_value = _USER
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def async_client(app):
+    """Create one async client for the module that calls the app in-process over ASGI.
+
+    The access-approval routes get the shared mock for as long as the client
+    lives, and the override is removed again on teardown.
+    """
+    app.dependency_overrides[get_document_access_service] = lambda: _SHARED_MOCK
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_document_access_service, None)
+
+
+@pytest.fixture(autouse=True)
 def mock_service():
-    """Create a mock DocumentAccessService."""
-    service = AsyncMock()
-    
-    # Mock data
-    user = User(id=1, name="John Doe", email="john@example.com")
-    document = Document(id=1, title="Test Document", owner_id=2)
-    access_request = AccessRequest(
-        id=1,
-        user_id=1,
-        document_id=1,
-        status=AccessRequestStatus.PENDING,
-        requested_at=datetime.now(),
-        user=user,
-        document=document
-    )
-    
-    service.get_access_requests.return_value = [access_request]
-    service.enrich_access_requests.return_value = [access_request]
-    service.create_access_request.return_value = access_request
-    service.make_decision.return_value = access_request
-    service.get_documents.return_value = [document]
-    service.get_document_by_id.return_value = document
-    service.get_users.return_value = [user]
-    service.get_user_by_id.return_value = user
-    
-    return service
+    """Provide the shared mock service with calls and side effects cleared."""
+    _SHARED_MOCK.reset_mock(return_value=False, side_effect=True)
+    return _SHARED_MOCK
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_access_requests(mock_service_class, mock_service):
+async def test_get_access_requests(async_client, mock_service):
     """Test getting access requests."""
-    mock_service_class.return_value = mock_service
-    
-    response = client.get("/access-approval/access-requests")
+    response = await async_client.get("/access-approval/access-requests")
     assert response.status_code == 200
+    mock_service.get_access_requests.assert_awaited_once_with(pending_only=False)
     
     data = response.json()
     assert data["success"] is True
@@ -56,12 +76,9 @@ def test_get_access_requests(mock_service_class, mock_service):
     assert isinstance(data["access_requests"], list)
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_pending_access_requests(mock_service_class, mock_service):
+async def test_get_pending_access_requests(async_client):
     """Test getting only pending access requests."""
-    mock_service_class.return_value = mock_service
-    
-    response = client.get("/access-approval/access-requests?pending_only=true")
+    response = await async_client.get("/access-approval/access-requests?pending_only=true")
     assert response.status_code == 200
     
     data = response.json()
@@ -72,17 +89,14 @@ def test_get_pending_access_requests(mock_service_class, mock_service):
         assert request["status"] == "pending"
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_create_access_request(mock_service_class, mock_service):
+async def test_create_access_request(async_client):
     """Test creating a new access request."""
-    mock_service_class.return_value = mock_service
-    
     request_data = {
         "document_id": 1,
         "reason": "Need access for project"
     }
     
-    response = client.post(
+    response = await async_client.post(
         "/access-approval/access-requests?user_id=1", 
         json=request_data
     )
@@ -93,17 +107,14 @@ def test_create_access_request(mock_service_class, mock_service):
     assert "Access request created successfully" in data["message"]
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_make_access_decision(mock_service_class, mock_service):
+async def test_make_access_decision(async_client):
     """Test making a decision on an access request."""
-    mock_service_class.return_value = mock_service
-    
     decision_data = {
         "decision": "approved",
         "reason": "Access granted for project needs"
     }
     
-    response = client.put(
+    response = await async_client.put(
         "/access-approval/access-requests/1/decision?approver_id=2",
         json=decision_data
     )
@@ -113,12 +124,9 @@ def test_make_access_decision(mock_service_class, mock_service):
     assert data["success"] is True
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_documents(mock_service_class, mock_service):
+async def test_get_documents(async_client):
     """Test getting all documents."""
-    mock_service_class.return_value = mock_service
-    
-    response = client.get("/access-approval/documents")
+    response = await async_client.get("/access-approval/documents")
     assert response.status_code == 200
     
     data = response.json()
@@ -129,12 +137,9 @@ def test_get_documents(mock_service_class, mock_service):
     assert len(data["documents"]) > 0  # Should have at least some documents
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_document_by_id(mock_service_class, mock_service):
+async def test_get_document_by_id(async_client):
     """Test getting a specific document."""
-    mock_service_class.return_value = mock_service
-    
-    response = client.get("/access-approval/documents/1")
+    response = await async_client.get("/access-approval/documents/1")
     assert response.status_code == 200
     
     data = response.json()
@@ -142,23 +147,9 @@ def test_get_document_by_id(mock_service_class, mock_service):
     assert data["document"]["id"] == 1
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_document_not_found(mock_service_class, mock_service):
-    """Test getting a document that doesn't exist."""
-    mock_service_class.return_value = mock_service
-    mock_service.get_document_by_id.return_value = None
-    
-    response = client.get("/access-approval/documents/999")
-    assert response.status_code == 404
-    assert "Document not found" in response.json()["detail"]
-
-
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_users(mock_service_class, mock_service):
+async def test_get_users(async_client):
     """Test getting all users."""
-    mock_service_class.return_value = mock_service
-    
-    response = client.get("/access-approval/users")
+    response = await async_client.get("/access-approval/users")
     assert response.status_code == 200
     
     data = response.json()
@@ -169,12 +160,9 @@ def test_get_users(mock_service_class, mock_service):
     assert len(data["users"]) > 0  # Should have at least some users
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_user_by_id(mock_service_class, mock_service):
+async def test_get_user_by_id(async_client):
     """Test getting a specific user."""
-    mock_service_class.return_value = mock_service
-    
-    response = client.get("/access-approval/users/1")
+    response = await async_client.get("/access-approval/users/1")
     assert response.status_code == 200
     
     data = response.json()
@@ -182,12 +170,13 @@ def test_get_user_by_id(mock_service_class, mock_service):
     assert data["user"]["id"] == 1
 
 
-@patch('routes.access_approval.DocumentAccessService')
-def test_get_user_not_found(mock_service_class, mock_service):
-    """Test getting a user that doesn't exist."""
-    mock_service_class.return_value = mock_service
-    mock_service.get_user_by_id.return_value = None
-    
-    response = client.get("/access-approval/users/999")
+@pytest.mark.parametrize("path,attr,message", [
+    ("/access-approval/documents/999", "get_document_by_id", "Document not found"),
+    ("/access-approval/users/999", "get_user_by_id", "User not found"),
+], ids=["document", "user"])
+async def test_get_not_found(async_client, mock_service, path, attr, message):
+    """Test getting a document or user that doesn't exist."""
+    with patch.object(getattr(mock_service, attr), 'return_value', None):
+        response = await async_client.get(path)
     assert response.status_code == 404
-    assert "User not found" in response.json()["detail"]
\ No newline at end of file
+    assert message in response.json()["detail"]
@@ -1,14 +1,12 @@
 """Integration tests for API endpoints."""
 
 import io
+import pytest
 from unittest.mock import patch, MagicMock
-from fastapi.testclient import TestClient
-from main import app
+from models.analysis import AnalysisResponse
 
-client = TestClient(app)
 
-
-def test_root_endpoint():
+def test_root_endpoint(client):
     """Test the root status endpoint."""
     response = client.get("/")
     assert response.status_code == 200
@@ -18,7 +16,7 @@ def test_root_endpoint():
     assert data["version"] == "0.4"
 
 
-def test_health_endpoint():
+def test_health_endpoint(client):
     """Test the health check endpoint."""
     response = client.get("/health")
     assert response.status_code == 200
@@ -29,85 +27,68 @@ def test_health_endpoint():
     assert "model" in data
 
 
-@patch('routes.analysis.analyze_contract')
-def test_analyze_endpoint_with_mock(mock_analyze):
-    """Test the analyze endpoint with mocked OpenAI response."""
-    from models.analysis import AnalysisResponse
-    
-    # Setup mock response
-    mock_analyze.return_value = AnalysisResponse(
-        summary="Test summary",
-        red_flags=["Test flag"],
-        pushbacks=["Test pushback"],
-        tokens_used=100
-    )
-    
-    # Create test file
-    test_file_content = b"This is a test contract with enough content to pass validation."
-    
-    response = client.post(
-        "/analyze",
-        files={"file": ("test.txt", io.BytesIO(test_file_content), "text/plain")},
-        data={"role": "freelancer", "risk_tolerance": "standard"}
-    )
-    
-    assert response.status_code == 200
+# Contract upload long enough to pass the endpoint's length check
+_CONTRACT_BYTES = b"This is a test contract with enough content to pass validation."
+
+
+def _upload(filename="test.txt", content=_CONTRACT_BYTES, content_type="text/plain"):
+    """Return a multipart file tuple with a fresh stream over the given bytes."""
+    return (filename, io.BytesIO(content), content_type)
+
+
+# Mock OpenAI analysis result returned by the patched analyze_contract
+_MOCK_RESPONSE = AnalysisResponse(
+    summary="Test summary",
+    red_flags=["Test flag"],
+    pushbacks=["Test pushback"],
+    tokens_used=100
+)
+
+
+def _check_analysis_json(response):
     data = response.json()
     assert "summary" in data
     assert "red_flags" in data
     assert "pushbacks" in data
 
 
-def test_analyze_endpoint_empty_file():
-    """Test the analyze endpoint with empty file."""
-    test_file_content = b""
-    
-    response = client.post(
-        "/analyze",
-        files={"file": ("test.txt", io.BytesIO(test_file_content), "text/plain")},
-        data={"role": "freelancer", "risk_tolerance": "standard"}
-    )
-    
-    assert response.status_code == 400
-    assert "empty or too short" in response.json()["detail"]
-
-
-@patch('routes.analysis.analyze_contract')
-def test_analyze_pdf_endpoint_with_mock(mock_analyze):
-    """Test the analyze_pdf endpoint with mocked OpenAI response."""
-    from models.analysis import AnalysisResponse
-    
-    # Setup mock response
-    mock_analyze.return_value = AnalysisResponse(
-        summary="Test summary",
-        red_flags=["Test flag"],
-        pushbacks=["Test pushback"],
-        tokens_used=100
-    )
-    
-    # Create test file
-    test_file_content = b"This is a test contract with enough content to pass validation."
-    
-    response = client.post(
-        "/analyze_pdf",
-        files={"file": ("test.txt", io.BytesIO(test_file_content), "text/plain")},
-        data={"role": "freelancer", "risk_tolerance": "standard"}
-    )
-    
-    assert response.status_code == 200
+def _check_pdf(response):
     assert response.headers["content-type"] == "application/pdf"
+    assert "content-encoding" not in response.headers  # PDFs are exempt from gzip
     assert response.content.startswith(b"%PDF-")
 
 
-def test_analyze_endpoint_unsupported_file():
-    """Test the analyze endpoint with unsupported file type."""
-    test_file_content = b"This is a test contract."
-    
+def _check_detail(text):
+    def check(response):
+        assert text in response.json()["detail"]
+    return check
+
+
+@pytest.mark.parametrize("endpoint,filename,content,content_type,expected_status,body_check", [
+    ("/analyze", "test.txt", _CONTRACT_BYTES, "text/plain", 200, _check_analysis_json),
+    ("/analyze", "test.txt", b"", "text/plain", 400, _check_detail("empty or too short")),
+    pytest.param("/analyze_pdf", "test.txt", _CONTRACT_BYTES, "text/plain", 200, _check_pdf,
+                 marks=pytest.mark.slow),
+    ("/analyze", "test.xyz", b"This is a test contract.",
+     "application/octet-stream", 400, _check_detail("Unsupported file type")),
+], ids=["analyze_with_mock", "analyze_empty_file", "analyze_pdf_with_mock", "analyze_unsupported_file"])
+@patch('routes.analysis.analyze_contract', return_value=_MOCK_RESPONSE)
+def test_analyze_endpoints(mock_analyze, client, endpoint, filename, content, content_type, expected_status, body_check):
+    """Test the analyze endpoints with a mocked OpenAI response."""
     response = client.post(
-        "/analyze",
-        files={"file": ("test.xyz", io.BytesIO(test_file_content), "application/octet-stream")},
+        endpoint,
+        files={"file": _upload(filename, content, content_type)},
         data={"role": "freelancer", "risk_tolerance": "standard"}
     )
     
-    assert response.status_code == 400
-    assert "Unsupported file type" in response.json()["detail"]
\ No newline at end of file
+    assert response.status_code == expected_status
+    body_check(response)
+
+
+@patch('routes.analysis.analyze_contract', return_value=_MOCK_RESPONSE.model_copy(update={"summary": "Test summary " * 100}))
+def test_analyze_json_is_gzipped(mock_analyze, client):
+    """Test that large JSON responses are gzip-compressed."""
+    response = client.post("/analyze", files={"file": _upload()})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    _check_analysis_json(response)
@@ -4,36 +4,22 @@ import pytest
 from fastapi import HTTPException
 from services.file_processor import extract_text_from_file
 
+_TXT_CONTENT = b"This is a test contract."
+_TXT_TEXT = _TXT_CONTENT.decode("utf-8")
 
-def test_extract_text_from_txt():
-    """Test text extraction from TXT file."""
-    content = b"This is a test contract."
-    result = extract_text_from_file("test.txt", content)
-    assert result == "This is a test contract."
 
+@pytest.mark.parametrize("filename", ["test.txt", "test.TXT"])
+def test_extract_text_from_txt(filename):
+    """Test text extraction from TXT file, matching the extension case-insensitively."""
+    result = extract_text_from_file(filename, _TXT_CONTENT)
+    assert result == _TXT_TEXT
 
-def test_extract_text_from_unsupported_format():
-    """Test extraction from unsupported file format raises HTTPException."""
-    content = b"test content"
-    with pytest.raises(HTTPException) as exc_info:
-        extract_text_from_file("test.xyz", content)
-    
-    assert exc_info.value.status_code == 400
-    assert "Unsupported file type" in exc_info.value.detail
 
-
-def test_extract_text_from_file_without_extension():
-    """Test extraction from file without extension raises HTTPException."""
-    content = b"test content"
+@pytest.mark.parametrize("filename", ["test.xyz", "testfile"])
+def test_extract_text_from_unsupported_file(filename):
+    """Test that unsupported or missing extensions raise HTTPException."""
     with pytest.raises(HTTPException) as exc_info:
-        extract_text_from_file("testfile", content)
+        extract_text_from_file(filename, b"test content")
     
     assert exc_info.value.status_code == 400
     assert "Unsupported file type" in exc_info.value.detail
-
-
-def test_extract_text_case_insensitive():
-    """Test that file extension matching is case insensitive."""
-    content = b"This is a test contract."
-    result = extract_text_from_file("test.TXT", content)
-    assert result == "This is a test contract."
\ No newline at end of file
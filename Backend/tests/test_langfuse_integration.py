@@ -2,41 +2,60 @@
 
 import pytest
 from unittest.mock import patch, MagicMock, Mock
-from services.openai_service import analyze_contract, langfuse
+from langfuse import Langfuse
+from services import openai_service
+from services.openai_core import MAX_CONTRACT_CHARS, split_contract
+from services.openai_service import analyze_contract, analyze_contracts_batch, langfuse
 from models.analysis import AnalysisResponse
 import os
 
 
+# Analysis expected from the canned model reply below
+_EXPECTED_RESPONSE = AnalysisResponse(
+    summary="Test contract",
+    red_flags=["Risk 1"],
+    pushbacks=["Ask 1"],
+    tokens_used=100
+)
+_ANALYSIS_REPLY = '{"summary": "Test contract", "red_flags": ["Risk 1"], "pushbacks": ["Ask 1"]}'
+
+
+@pytest.fixture(autouse=True)
+def _api_key(monkeypatch):
+    """Configure a test API key for every test in the module."""
+    monkeypatch.setattr('services.openai_service._API_KEY', 'test-key')
+
+
+def _mock_openai_client(content, total_tokens=100):
+    """Build a mock OpenAI client whose completions return the given reply."""
+    mock_client = MagicMock()
+    mock_completion = MagicMock()
+    mock_completion.choices[0].message.content = content
+    mock_completion.usage.total_tokens = total_tokens
+    mock_client.chat.completions.create.return_value = mock_completion
+    return mock_client
+
+
 def test_langfuse_integration_imports():
     """Test that Langfuse imports are working correctly."""
     # Test that langfuse client is initialized
     assert langfuse is not None
     # Test that it's a Langfuse client instance
-    from langfuse import Langfuse
     assert isinstance(langfuse, Langfuse)
     
 
-@patch('services.openai_service._API_KEY', 'test-key')
 @patch('services.openai_service._get_openai_client')
 def test_analyze_contract_with_langfuse_observe(mock_get_client):
     """Test that analyze_contract function has the @observe decorator applied."""
     # Setup mock OpenAI client
-    mock_client = MagicMock()
-    mock_completion = MagicMock()
-    mock_completion.choices[0].message.content = '{"summary": "Test contract", "red_flags": ["Risk 1"], "pushbacks": ["Ask 1"]}'
-    mock_completion.usage.total_tokens = 100
-    mock_client.chat.completions.create.return_value = mock_completion
+    mock_client = _mock_openai_client(_ANALYSIS_REPLY)
     mock_get_client.return_value = mock_client
     
     # Call the function
     result = analyze_contract("This is a test contract", "freelancer", "standard")
     
     # Verify the function still works correctly
-    assert isinstance(result, AnalysisResponse)
-    assert result.summary == "Test contract"
-    assert result.red_flags == ["Risk 1"]
-    assert result.pushbacks == ["Ask 1"]
-    assert result.tokens_used == 100
+    assert result == _EXPECTED_RESPONSE
     
     # Verify OpenAI client was called
     mock_client.chat.completions.create.assert_called_once()
@@ -46,7 +65,6 @@ def test_langfuse_configuration():
     """Test that Langfuse is configured with correct host."""
     # Since the client may not expose credentials directly, 
     # we just test that it's properly configured
-    from langfuse import Langfuse
     assert isinstance(langfuse, Langfuse)
 
 
@@ -59,4 +77,114 @@ def test_observe_decorator_applied():
     
     # Check if function has been wrapped (decorator adds attributes)
     # This is the most reliable way to check for the decorator
-    assert callable(analyze_contract)
\ No newline at end of file
+    assert callable(analyze_contract)
+
+
+@patch('services.openai_service._get_openai_client')
+def test_analyze_contracts_batch_single_request(mock_get_client):
+    """Test that several contracts are analyzed in one request and matched back by id."""
+    mock_client = _mock_openai_client(
+        '{"results": ['
+        '{"id": 1, "summary": "Second", "red_flags": ["B"], "pushbacks": []},'
+        '{"id": 0, "summary": "First", "red_flags": ["A"], "pushbacks": ["Ask"]}'
+        ']}'
+    )
+    mock_get_client.return_value = mock_client
+
+    results = analyze_contracts_batch([
+        ("First contract text", "freelancer", "standard"),
+        ("Second contract text", "contractor", "low"),
+    ])
+
+    assert [r.summary for r in results] == ["First", "Second"]
+    assert results[0].pushbacks == ["Ask"]
+    mock_client.chat.completions.create.assert_called_once()
+
+
+@patch('services.openai_service._get_openai_client')
+def test_analyze_long_contract_is_chunked(mock_get_client):
+    """Test that contracts over the prompt limit are mapped per chunk and then reduced."""
+    mock_client = _mock_openai_client('{"summary": "Merged", "red_flags": ["Risk"], "pushbacks": ["Ask"]}', 10)
+    mock_get_client.return_value = mock_client
+
+    long_text = "\n".join(f"{i}. Clause {i} " + "term " * 200 for i in range(1, 40))
+    assert len(long_text) > MAX_CONTRACT_CHARS
+
+    result = analyze_contract(long_text, "freelancer", "standard")
+
+    chunk_count = len(split_contract(long_text))
+    assert result.summary == "Merged"
+    assert mock_client.chat.completions.create.call_count == chunk_count + 1
+    assert result.tokens_used == 10 * (chunk_count + 1)
+
+
+@patch('services.openai_service._get_openai_client')
+def test_chunked_analysis_accepts_non_object_findings(mock_get_client):
+    """Test that a chunk reply that is a JSON list or plain text doesn't abort the analysis."""
+    def create(model, messages, temperature):
+        completion = MagicMock()
+        prompt = messages[1]["content"]
+        if "This is part 1 of" in prompt:
+            content = '["Risk A", "Risk B"]'
+        elif "This is part" in prompt:
+            content = 'not json at all'
+        else:
+            content = _ANALYSIS_REPLY
+        completion.choices[0].message.content = content
+        completion.usage.total_tokens = 10
+        return completion
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = create
+    mock_get_client.return_value = mock_client
+
+    long_text = "\n".join(f"{i}. Clause {i} " + "term " * 200 for i in range(1, 40))
+    result = analyze_contract(long_text, "freelancer", "standard")
+
+    assert result.summary == "Test contract"
+    reduce_prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert '"notes":["Risk A","Risk B"],"part":1' in reduce_prompt
+    assert '"notes":"not json at all","part":2' in reduce_prompt
+
+
+@patch('services.openai_service._get_openai_client')
+def test_batch_sends_long_contracts_through_chunked_analysis(mock_get_client):
+    """Test that a contract over the prompt limit is chunked rather than truncated inside a batch."""
+    mock_client = _mock_openai_client(
+        '{"summary": "Merged", "red_flags": [], "pushbacks": [],'
+        ' "results": [{"id": 0, "summary": "First"}, {"id": 2, "summary": "Third"}]}', 10
+    )
+    mock_get_client.return_value = mock_client
+
+    long_text = "\n".join(f"{i}. Clause {i} " + "term " * 200 for i in range(1, 40))
+    results = analyze_contracts_batch([
+        ("First contract text", "freelancer", "standard"),
+        (long_text, "freelancer", "standard"),
+        ("Third contract text", "contractor", "low"),
+    ])
+
+    assert [r.summary for r in results] == ["First", "Merged", "Third"]
+    prompts = [c.kwargs["messages"][1]["content"] for c in mock_client.chat.completions.create.call_args_list]
+    batch_prompts = [p for p in prompts if "CONTRACTS (JSON)" in p]
+    assert len(batch_prompts) == 1 and "Clause 1 " not in batch_prompts[0]
+    assert len(prompts) == len(split_contract(long_text)) + 2
+
+
+@patch('services.openai_service._TRACE_SAMPLE_RATE', 0.0)
+@patch('services.openai_service._get_openai_client')
+def test_unsampled_analysis_is_not_traced(mock_get_client):
+    """Test that analyses outside the sample rate skip tracing but failures are still traced."""
+    mock_client = _mock_openai_client(_ANALYSIS_REPLY)
+    mock_get_client.return_value = mock_client
+
+    with patch.object(openai_service, '_enqueue_trace') as mock_trace, \
+            patch.object(openai_service._TRACE_Q, 'put') as mock_put:
+        analyze_contract("This is a test contract", "freelancer", "standard")
+        mock_trace.assert_not_called()
+        mock_put.assert_not_called()
+
+        mock_client.chat.completions.create.side_effect = RuntimeError("boom")
+        with pytest.raises(Exception):
+            analyze_contract("This is a test contract", "freelancer", "standard")
+        mock_put.assert_called_once()
+        assert mock_put.call_args[0][0]["level"] == "ERROR"
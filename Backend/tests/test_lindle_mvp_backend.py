@@ -0,0 +1,41 @@
+"""Tests for the standalone Lindle MVP backend."""
+
+import importlib
+
+import pytest
+from unittest.mock import patch
+
+
+class _ByteEncoding:
+    """Fake tokenizer with one token per UTF-8 byte, so non-ASCII text has more tokens than characters."""
+
+    def __init__(self):
+        self.encode_calls = 0
+
+    def encode(self, text):
+        self.encode_calls += 1
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens):
+        return bytes(tokens).decode("utf-8", errors="ignore")
+
+
+@pytest.fixture
+def mvp(monkeypatch):
+    """Import the monolith; its OpenAI client needs an API key at import time."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    return importlib.import_module("lindle_mvp_backend_fastapi")
+
+
+def test_trim_contract_skips_encoding_short_ascii(mvp):
+    """Test that short ASCII contracts are returned without tokenizing."""
+    encoding = _ByteEncoding()
+    with patch.object(mvp, "_ENCODING", encoding), patch.object(mvp, "MAX_CONTRACT_TOKENS", 12):
+        assert mvp._trim_contract("short terms") == "short terms"
+    assert encoding.encode_calls == 0
+
+
+def test_trim_contract_counts_tokens_for_multibyte_text(mvp):
+    """Test that non-ASCII text under the limit in characters is still trimmed by tokens."""
+    with patch.object(mvp, "_ENCODING", _ByteEncoding()), patch.object(mvp, "MAX_CONTRACT_TOKENS", 12):
+        assert mvp._trim_contract("é" * 10) == "é" * 6
@@ -1,14 +1,22 @@
 """Tests for PDF service."""
 
-from services.pdf_service import generate_analysis_pdf
+import io
 
+import pytest
 
-def test_generate_analysis_pdf():
+from services.pdf_service import generate_analysis_pdf, iter_analysis_pdf
+
+# Every test here renders a PDF with reportlab
+pytestmark = pytest.mark.slow
+
+
+@pytest.mark.parametrize("summary,red_flags,pushbacks", [
+    ("This is a test contract summary.", ["Red flag 1", "Red flag 2"], ["Pushback 1", "Pushback 2"]),
+    ("Test summary", [], []),  # empty red flags and pushbacks
+    ("Line 1\nLine 2\nLine 3", ["Flag 1"], ["Pushback 1"]),  # multiline summary
+], ids=["sample", "empty_lists", "multiline_summary"])
+def test_generate_analysis_pdf(summary, red_flags, pushbacks):
     """Test PDF generation with sample data."""
-    summary = "This is a test contract summary."
-    red_flags = ["Red flag 1", "Red flag 2"]
-    pushbacks = ["Pushback 1", "Pushback 2"]
-    
     pdf_bytes = generate_analysis_pdf(summary, red_flags, pushbacks)
     
     # Check that we got bytes back
@@ -19,27 +27,20 @@ def test_generate_analysis_pdf():
     assert pdf_bytes.startswith(b"%PDF-")
 
 
-def test_generate_pdf_with_empty_lists():
-    """Test PDF generation with empty red flags and pushbacks."""
-    summary = "Test summary"
-    red_flags = []
-    pushbacks = []
-    
-    pdf_bytes = generate_analysis_pdf(summary, red_flags, pushbacks)
-    
-    assert isinstance(pdf_bytes, bytes)
-    assert len(pdf_bytes) > 0
-    assert pdf_bytes.startswith(b"%PDF-")
+def test_generate_pdf_into_stream():
+    """Test PDF generation written directly into a caller-provided stream."""
+    buffer = io.BytesIO()
 
+    result = generate_analysis_pdf("Stream summary", ["Flag"], ["Pushback"], buffer)
 
-def test_generate_pdf_with_multiline_summary():
-    """Test PDF generation with multiline summary."""
-    summary = "Line 1\nLine 2\nLine 3"
-    red_flags = ["Flag 1"]
-    pushbacks = ["Pushback 1"]
-    
-    pdf_bytes = generate_analysis_pdf(summary, red_flags, pushbacks)
-    
-    assert isinstance(pdf_bytes, bytes)
-    assert len(pdf_bytes) > 0
-    assert pdf_bytes.startswith(b"%PDF-")
\ No newline at end of file
+    assert result is None
+    assert buffer.getvalue().startswith(b"%PDF-")
+
+
+def test_iter_analysis_pdf_yields_chunks():
+    """Test that the chunked PDF iterator yields a complete document."""
+    chunks = list(iter_analysis_pdf("Chunked summary", ["Flag"], ["Pushback"], chunk_size=256))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 256 for chunk in chunks)
+    assert b"".join(chunks).startswith(b"%PDF-")
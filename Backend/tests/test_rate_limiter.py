@@ -0,0 +1,35 @@
+"""Tests for the OpenAI rate limiter."""
+
+import time
+
+from services.rate_limiter import TokenBucket
+
+
+def test_token_bucket_allows_initial_burst():
+    """Test that a full bucket admits up to its capacity without waiting."""
+    bucket = TokenBucket(rate=1, capacity=5)
+
+    start = time.monotonic()
+    for _ in range(5):
+        assert bucket.acquire(1)
+
+    assert time.monotonic() - start < 0.1
+
+
+def test_token_bucket_paces_after_burst():
+    """Test that requests beyond the burst wait for refills."""
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire(1)
+
+    start = time.monotonic()
+    assert bucket.acquire(1)
+
+    assert time.monotonic() - start >= 0.04
+
+
+def test_token_bucket_timeout():
+    """Test that acquire gives up once the timeout passes."""
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.acquire(2)
+
+    assert bucket.acquire(2, timeout=0.01) is False
@@ -1,23 +1,51 @@
 """Integration tests for vault API endpoints."""
 
 import pytest
-import tempfile
-import os
+from contextlib import ExitStack, nullcontext
 from unittest.mock import patch
-from fastapi.testclient import TestClient
 
-from main import app
+from services import vault_service
+from services.vault_service import save_vaults
+
+
+@pytest.fixture(scope="module")
+def vault_store():
+    """Persist vaults to an in-memory dict of user_id -> vault data instead of vaults.json.
+
+    The store lives in the test process, so pytest-xdist workers never share it.
+    """
+    store = {}
+
+    def read_vaults(path=None):
+        return vault_service._VAULTS_ADAPTER.validate_python(list(store.values()))
+
+    def write_vaults(path, vaults):
+        store.clear()
+        store.update((vault.user_id, vault.model_dump()) for vault in vaults)
+
+    def append_log(path, changes):
+        for user_id, vault in changes:
+            if vault is None:
+                store.pop(user_id, None)
+            else:
+                store[user_id] = vault.model_dump()
+
+    with ExitStack() as stack:
+        stack.enter_context(patch('services.vault_service.VAULTS_FILE', 'memory://vaults.json'))
+        stack.enter_context(patch('services.vault_service._read_vaults_file', read_vaults))
+        stack.enter_context(patch('services.vault_service._write_vaults_file', write_vaults))
+        stack.enter_context(patch('services.vault_service._append_vault_log', append_log))
+        stack.enter_context(patch('services.vault_service._file_lock', lambda path: nullcontext()))
+        yield store
+        # Write pending changes to the store before the real file functions return
+        vault_service._flush_pending_save()
 
 
-# Mock the vault service to use a temporary directory
 @pytest.fixture
-def client_with_temp_data():
-    """Create test client with temporary data directory."""
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        with patch('services.vault_service.DATA_DIR', tmp_dir):
-            with patch('services.vault_service.VAULTS_FILE', os.path.join(tmp_dir, 'vaults.json')):
-                with TestClient(app) as client:
-                    yield client
+def client_with_temp_data(vault_store, client):
+    """Provide the shared test client with an empty vault store."""
+    save_vaults([])
+    yield client
 
 
 def test_get_empty_vault(client_with_temp_data):
@@ -32,8 +60,11 @@ def test_get_empty_vault(client_with_temp_data):
     assert data["vault"]["potential_contractors"] == []
 
 
-def test_create_vault(client_with_temp_data):
-    """Test creating a new vault."""
+def test_vault_full_lifecycle(client_with_temp_data, vault_store):
+    """Test creating, updating, sharing and deleting one vault in a single flow."""
+    client = client_with_temp_data
+    
+    # Create the vault
     vault_data = {
         "stake": "High stakes project",
         "availability": "Available 40 hours/week",
@@ -51,9 +82,13 @@ def test_create_vault(client_with_temp_data):
         }
     }
     
-    response = client_with_temp_data.post("/vault/test_user", json=vault_data)
+    response = client.post("/vault/test_user", json=vault_data)
     assert response.status_code == 200
     
+    # The vault reaches the store once the pending save is written
+    vault_service._flush_pending_save()
+    assert vault_store["test_user"]["stake"] == "High stakes project"
+    
     data = response.json()
     assert data["success"] == True
     assert data["message"] == "Vault updated successfully"
@@ -64,19 +99,6 @@ def test_create_vault(client_with_temp_data):
     assert data["vault"]["potential_contractors"][0]["name"] == "John Doe"
     assert data["vault"]["sharing_settings"]["is_public"] == False
     assert data["vault"]["sharing_settings"]["shared_with_users"] == ["user2", "user3"]
-
-
-def test_update_vault(client_with_temp_data):
-    """Test updating an existing vault."""
-    # Create initial vault
-    initial_data = {
-        "stake": "Initial stake",
-        "availability": "Initial availability",
-        "sharing_settings": {"is_public": False}
-    }
-    
-    response1 = client_with_temp_data.post("/vault/update_user", json=initial_data)
-    assert response1.status_code == 200
     
     # Update the vault
     update_data = {
@@ -86,14 +108,44 @@ def test_update_vault(client_with_temp_data):
         ]
     }
     
-    response2 = client_with_temp_data.post("/vault/update_user", json=update_data)
-    assert response2.status_code == 200
+    response = client.post("/vault/test_user", json=update_data)
+    assert response.status_code == 200
     
-    data = response2.json()
+    data = response.json()
     assert data["vault"]["stake"] == "Updated stake"
-    assert data["vault"]["availability"] == "Initial availability"  # Should remain unchanged
+    assert data["vault"]["availability"] == "Available 40 hours/week"  # Should remain unchanged
     assert len(data["vault"]["potential_contractors"]) == 1
     assert data["vault"]["potential_contractors"][0]["name"] == "New Contractor"
+    
+    # Update sharing settings
+    sharing_data = {
+        "is_public": True,
+        "shared_with_users": ["user1", "user2"]
+    }
+    
+    response = client.put("/vault/test_user/share", json=sharing_data)
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert data["success"] == True
+    assert data["message"] == "Sharing settings updated successfully"
+    assert data["vault"]["sharing_settings"]["is_public"] == True
+    assert data["vault"]["sharing_settings"]["shared_with_users"] == ["user1", "user2"]
+    
+    # Delete the vault
+    response = client.delete("/vault/test_user")
+    assert response.status_code == 200
+    
+    data = response.json()
+    assert data["success"] == True
+    assert data["message"] == "Vault deleted successfully"
+
+
+def test_delete_missing_vault(client_with_temp_data):
+    """Test that deleting a vault that doesn't exist returns 404."""
+    response = client_with_temp_data.delete("/vault/missing_user")
+    assert response.status_code == 404
+    assert "Vault not found" in response.json()["detail"]
 
 
 def test_get_accessible_vaults(client_with_temp_data):
@@ -130,49 +182,4 @@ def test_get_accessible_vaults(client_with_temp_data):
     assert data["success"] == True
     assert data["total"] == 2  # Public and shared vaults
     
-    user_ids = [vault["user_id"] for vault in data["vaults"]]
-    assert "public_user" in user_ids
-    assert "shared_user" in user_ids
-    assert "private_user" not in user_ids
-
-
-def test_update_vault_sharing(client_with_temp_data):
-    """Test updating vault sharing settings."""
-    # Create a vault first
-    vault_data = {"stake": "Test project"}
-    client_with_temp_data.post("/vault/share_user", json=vault_data)
-    
-    # Update sharing settings
-    sharing_data = {
-        "is_public": True,
-        "shared_with_users": ["user1", "user2"]
-    }
-    
-    response = client_with_temp_data.put("/vault/share_user/share", json=sharing_data)
-    assert response.status_code == 200
-    
-    data = response.json()
-    assert data["success"] == True
-    assert data["message"] == "Sharing settings updated successfully"
-    assert data["vault"]["sharing_settings"]["is_public"] == True
-    assert data["vault"]["sharing_settings"]["shared_with_users"] == ["user1", "user2"]
-
-
-def test_delete_vault(client_with_temp_data):
-    """Test deleting a vault."""
-    # Create a vault first
-    vault_data = {"stake": "To be deleted"}
-    client_with_temp_data.post("/vault/delete_user", json=vault_data)
-    
-    # Delete the vault
-    response = client_with_temp_data.delete("/vault/delete_user")
-    assert response.status_code == 200
-    
-    data = response.json()
-    assert data["success"] == True
-    assert data["message"] == "Vault deleted successfully"
-    
-    # Try to delete again (should fail)
-    response2 = client_with_temp_data.delete("/vault/delete_user")
-    assert response2.status_code == 404
-    assert "Vault not found" in response2.json()["detail"]
\ No newline at end of file
+    assert {vault["user_id"] for vault in data["vaults"]} == {"public_user", "shared_user"}
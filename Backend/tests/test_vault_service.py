@@ -1,27 +1,43 @@
 """Tests for vault service functionality."""
 
+import asyncio
 import pytest
 import os
 import tempfile
 import json
-from datetime import datetime
+import shutil
 from unittest.mock import patch
 
+from services import vault_service
 from services.vault_service import (
     load_vaults, save_vaults, get_vault_by_user_id,
     create_or_update_vault, get_accessible_vaults, delete_vault,
+    add_clause_to_category, delete_category, delete_clause,
+    search_clauses,
     VAULTS_FILE, DATA_DIR
 )
-from models.vault import VaultData, ContractorInfo, SharingSettings
+from models.vault import VaultData, ContractorInfo, SharingSettings, ClauseCreateRequest, PreferenceLevel
 
 
 @pytest.fixture
 def temp_data_dir():
-    """Create a temporary directory for testing."""
+    """Create a temporary directory for testing.
+
+    Pending changes are flushed while the directory still exists, and the
+    index is reset so nothing points at it after the test.
+    """
     with tempfile.TemporaryDirectory() as tmp_dir:
         with patch('services.vault_service.DATA_DIR', tmp_dir):
             with patch('services.vault_service.VAULTS_FILE', os.path.join(tmp_dir, 'vaults.json')):
-                yield tmp_dir
+                try:
+                    yield tmp_dir
+                finally:
+                    with vault_service._INDEX_LOCK:
+                        if os.path.isdir(tmp_dir):
+                            vault_service._flush_pending_save()
+                        vault_service._PENDING.clear()
+                        vault_service._INDEX_PATH = None
+                        vault_service._INDEX_SIGNATURE = ()
 
 
 def test_load_vaults_empty_file(temp_data_dir):
@@ -30,9 +46,8 @@ def test_load_vaults_empty_file(temp_data_dir):
     assert vaults == []
 
 
-def test_save_and_load_vaults(temp_data_dir):
+def test_save_and_load_vaults(temp_data_dir, created_time):
     """Test saving and loading vaults."""
-    created_time = datetime.now().isoformat()
     vault = VaultData(
         user_id="test_user",
         stake="Test stake",
@@ -53,9 +68,8 @@ def test_save_and_load_vaults(temp_data_dir):
     assert loaded_vaults[0].stake == "Test stake"
 
 
-def test_get_vault_by_user_id(temp_data_dir):
+def test_get_vault_by_user_id(temp_data_dir, created_time):
     """Test getting vault by user ID."""
-    created_time = datetime.now().isoformat()
     vault1 = VaultData(
         user_id="user1",
         stake="Stake 1",
@@ -128,9 +142,8 @@ def test_update_existing_vault(temp_data_dir):
     assert updated_vault.updated_at != initial_vault.updated_at  # Should be updated
 
 
-def test_get_accessible_vaults(temp_data_dir):
+def test_get_accessible_vaults(temp_data_dir, created_time):
     """Test getting accessible vaults based on sharing settings."""
-    created_time = datetime.now().isoformat()
     
     # Public vault
     public_vault = VaultData(
@@ -175,9 +188,8 @@ def test_get_accessible_vaults(temp_data_dir):
     assert public_user_ids == ["public_user"]
 
 
-def test_delete_vault(temp_data_dir):
+def test_delete_vault(temp_data_dir, created_time):
     """Test deleting a vault."""
-    created_time = datetime.now().isoformat()
     vault1 = VaultData(
         user_id="user1",
         stake="Stake 1",
@@ -204,4 +216,211 @@ def test_delete_vault(temp_data_dir):
     
     # Try to delete non-existent vault
     no_success = delete_vault("non_existent_user")
-    assert no_success == False
\ No newline at end of file
+    assert no_success == False
+
+
+def test_mutations_are_written_by_background_save(temp_data_dir):
+    """Test that in-memory mutations reach the change log once pending saves are flushed."""
+    create_or_update_vault(user_id="persist_user")
+    assert delete_vault("persist_user") == True
+    create_or_update_vault(user_id="kept_user")
+    
+    vault_service._flush_pending_save()
+    
+    with open(os.path.join(temp_data_dir, 'vaults.json.log')) as f:
+        header, *records = [json.loads(line) for line in f]
+    assert "_snapshot" in header
+    assert [record.get("user_id", record.get("_delete")) for record in records] == ["persist_user", "kept_user"]
+    
+    # Reloading replays the log
+    vault_service._INDEX_PATH = None
+    assert [vault.user_id for vault in load_vaults()] == ["kept_user"]
+
+
+def test_log_is_compacted_into_snapshot(temp_data_dir):
+    """Test that an oversized change log is folded into vaults.json and removed."""
+    save_vaults([])
+    
+    with patch('services.vault_service.VAULT_LOG_MIN_COMPACT_BYTES', 0):
+        create_or_update_vault(user_id="compact_user")
+        vault_service._flush_pending_save()
+    
+    assert not os.path.exists(os.path.join(temp_data_dir, 'vaults.json.log'))
+    with open(os.path.join(temp_data_dir, 'vaults.json')) as f:
+        assert [vault["user_id"] for vault in json.load(f)] == ["compact_user"]
+
+
+def test_flush_keeps_outside_write_and_pending_changes(temp_data_dir, created_time):
+    """Test that saving over a file another process changed keeps both sets of vaults."""
+    save_vaults([])
+    create_or_update_vault(user_id="mine")
+
+    # Another worker rewrites the file while our change is still pending
+    other = VaultData(user_id="other", stake="Elsewhere", created_at=created_time, updated_at=created_time)
+    with open(os.path.join(temp_data_dir, 'vaults.json'), 'w') as f:
+        json.dump([other.model_dump()], f)
+
+    vault_service._flush_pending_save()
+
+    assert sorted(vault.user_id for vault in load_vaults()) == ["mine", "other"]
+    vault_service._INDEX_PATH = None
+    assert sorted(vault.user_id for vault in load_vaults()) == ["mine", "other"]
+
+
+def test_compaction_keeps_outside_write(temp_data_dir, created_time):
+    """Test that compacting the log never drops a vault another process wrote."""
+    save_vaults([])
+    create_or_update_vault(user_id="mine")
+
+    other = VaultData(user_id="other", stake="Elsewhere", created_at=created_time, updated_at=created_time)
+    with open(os.path.join(temp_data_dir, 'vaults.json'), 'w') as f:
+        json.dump([other.model_dump()], f)
+
+    with patch('services.vault_service.VAULT_LOG_MIN_COMPACT_BYTES', 0):
+        vault_service._flush_pending_save()
+
+    assert not os.path.exists(os.path.join(temp_data_dir, 'vaults.json.log'))
+    with open(os.path.join(temp_data_dir, 'vaults.json')) as f:
+        assert sorted(vault["user_id"] for vault in json.load(f)) == ["mine", "other"]
+
+
+def test_log_left_by_interrupted_compaction_is_ignored(temp_data_dir, created_time):
+    """Test that a log whose removal was cut short is not replayed over the new snapshot."""
+    save_vaults([VaultData(user_id="kept", created_at=created_time, updated_at=created_time)])
+    create_or_update_vault(user_id="deleted_later")
+    vault_service._flush_pending_save()
+
+    # Stop right after the new snapshot replaces the old one
+    with patch('services.vault_service._remove_file', side_effect=RuntimeError("crash")):
+        with pytest.raises(RuntimeError):
+            save_vaults([])
+    assert os.path.exists(os.path.join(temp_data_dir, 'vaults.json.log'))
+
+    vault_service._INDEX_PATH = None
+    assert load_vaults() == []
+
+
+def test_flush_does_not_recreate_removed_data_dir(temp_data_dir):
+    """Test that saving into a deleted data directory fails instead of recreating it."""
+    save_vaults([])
+    create_or_update_vault(user_id="orphan")
+    shutil.rmtree(temp_data_dir)
+
+    with pytest.raises(OSError):
+        vault_service._flush_pending_save()
+    assert not os.path.exists(temp_data_dir)
+
+    vault_service._PENDING.clear()
+    os.makedirs(temp_data_dir)
+
+
+def test_damaged_snapshot_is_never_saved_over(temp_data_dir, created_time):
+    """Test that a snapshot that fails to parse is neither read as empty nor overwritten."""
+    save_vaults([VaultData(user_id="existing", created_at=created_time, updated_at=created_time)])
+    create_or_update_vault(user_id="pending")
+
+    snapshot_path = os.path.join(temp_data_dir, 'vaults.json')
+    with open(snapshot_path, 'w') as f:
+        f.write('[{"user_id": "existing", ')
+
+    with patch('services.vault_service.VAULT_LOG_MIN_COMPACT_BYTES', 0):
+        with pytest.raises(Exception):
+            vault_service._flush_pending_save()
+    with open(snapshot_path) as f:
+        assert f.read() == '[{"user_id": "existing", '
+    assert "pending" in vault_service._PENDING
+
+    # Reads keep serving the last good index instead of an empty store
+    assert {vault.user_id for vault in load_vaults()} == {"existing", "pending"}
+
+    # A fresh load raises rather than returning no vaults
+    vault_service._PENDING.clear()
+    vault_service._INDEX_PATH = None
+    with pytest.raises(Exception):
+        load_vaults()
+
+
+def test_index_reloads_after_outside_write(temp_data_dir, created_time):
+    """Test that reads come from memory until another process rewrites the file."""
+    save_vaults([VaultData(user_id="cached_user", created_at=created_time, updated_at=created_time)])
+    
+    with patch('services.vault_service._read_vaults_file') as mock_read:
+        assert get_vault_by_user_id("cached_user") is not None
+        mock_read.assert_not_called()
+    
+    # Simulate another worker replacing the file
+    other = VaultData(user_id="other_user", stake="Elsewhere", created_at=created_time, updated_at=created_time)
+    with open(os.path.join(temp_data_dir, 'vaults.json'), 'w') as f:
+        json.dump([other.model_dump()], f)
+    
+    assert get_vault_by_user_id("cached_user") is None
+    assert get_vault_by_user_id("other_user").stake == "Elsewhere"
+
+
+def test_search_clauses_uses_substring_semantics(temp_data_dir):
+    """Test that clause search matches substrings across word boundaries."""
+    vault = create_or_update_vault(user_id="search_user")
+    category_id = vault.clause_categories[0].id
+    add_clause_to_category("search_user", category_id, ClauseCreateRequest(
+        title="NET 30", content="Payment terms apply", tags=["Payment"],
+        preference_level=PreferenceLevel.PREFERRED
+    ))
+    add_clause_to_category("search_user", category_id, ClauseCreateRequest(
+        title="NET 15", content="Late fees apply", tags=["payment"]
+    ))
+    
+    assert [c.title for c in search_clauses("search_user", "ment ter")] == ["NET 30"]
+    assert [c.title for c in search_clauses("search_user", "net", ["PAYMENT"])] == ["NET 30", "NET 15"]
+    assert [c.title for c in search_clauses("search_user", "", [], PreferenceLevel.PREFERRED)] == ["NET 30"]
+    assert search_clauses("search_user", "missing") == []
+
+
+def test_warm_vault_index_reads_file(temp_data_dir, created_time):
+    """Test that warming the index at startup fills it from the JSON file."""
+    save_vaults([VaultData(user_id="async_user", stake="Async", created_at=created_time, updated_at=created_time)])
+    # Force the next load to come from disk
+    vault_service._INDEX_PATH = None
+
+    asyncio.run(vault_service.warm_vault_index())
+    assert vault_service._INDEX_PATH == vault_service.VAULTS_FILE
+
+    vaults = load_vaults()
+
+    assert [v.user_id for v in vaults] == ["async_user"]
+    assert vaults[0].stake == "Async"
+
+
+def test_delete_category_and_clause(temp_data_dir):
+    """Test deleting a clause and a category only removes the matching item."""
+    vault = create_or_update_vault(user_id="delete_user")
+    first, second = vault.clause_categories[0], vault.clause_categories[1]
+    kept = add_clause_to_category("delete_user", first.id, ClauseCreateRequest(title="Keep", content="a"))
+    removed = add_clause_to_category("delete_user", first.id, ClauseCreateRequest(title="Drop", content="b"))
+
+    assert delete_clause("delete_user", first.id, removed.id) == True
+    assert delete_clause("delete_user", first.id, removed.id) == False
+    assert [c.id for c in get_vault_by_user_id("delete_user").clause_categories[0].clauses] == [kept.id]
+
+    assert delete_category("delete_user", second.id) == True
+    assert delete_category("delete_user", second.id) == False
+    remaining_ids = [c.id for c in get_vault_by_user_id("delete_user").clause_categories]
+    assert second.id not in remaining_ids
+    assert first.id in remaining_ids
+
+
+def test_accessible_vaults_follow_sharing_changes(temp_data_dir):
+    """Test that accessible vaults reflect sharing updates and deletions."""
+    create_or_update_vault(user_id="owner")
+    assert [v.user_id for v in get_accessible_vaults("reader")] == []
+
+    create_or_update_vault(user_id="owner", sharing_settings=SharingSettings(shared_with_users=["reader"]))
+    assert [v.user_id for v in get_accessible_vaults("reader")] == ["owner"]
+    assert get_accessible_vaults() == []
+
+    create_or_update_vault(user_id="owner", sharing_settings=SharingSettings(is_public=True))
+    assert [v.user_id for v in get_accessible_vaults()] == ["owner"]
+    assert [v.user_id for v in get_accessible_vaults("owner")] == ["owner"]
+
+    delete_vault("owner")
+    assert get_accessible_vaults("reader") == []
+    assert get_accessible_vaults() == []